@@ -18,24 +18,125 @@ import logging
 import numpy as np
 import pandas as pd
 from IPython.display import display  # for nice tables in notebooks
+from pandas.api.types import is_bool_dtype
+from pandas.api.types import is_integer_dtype
+from pandas.api.types import is_numeric_dtype
+
+# numexpr er valgfritt: store kolonner avrundes da i én flertrådet løkke uten
+# mellomliggende arrays. Uten numexpr brukes numpy.
+try:
+    import numexpr as ne
+
+    _HAR_NUMEXPR = True
+except ImportError:  # pragma: no cover
+    _HAR_NUMEXPR = False
 
 logger = logging.getLogger(__name__)
 
+# Under denne størrelsen koster oppstarten i numexpr mer enn den sparer
+_NUMEXPR_MIN_SIZE = 16384
+
+# Skalafaktorene for antall desimaler som brukes i konverter_dtypes
+_SKALA = {0: 1.0, 1: 10.0, 2: 100.0}
+
 
 # %%
-def _round_half_up(values: pd.Series, decimals: int = 0) -> pd.Series:
-    """Kommersiell avrunding (0.5 -> 1, -0.5 -> -1), også for desimaler.
+def _som_tall(values: pd.DataFrame) -> pd.DataFrame:
+    """Gjør kolonner som ikke er numeriske (f.eks. ``object`` fra CSV) om til tall.
 
-    Fungerer på numpy-arrays eller pandas-Serier av tall.
+    Verdier som ikke kan tolkes som tall blir NaN (``<NA>`` etter cast til Int64).
+    Numeriske kolonner brukes som de er.
     """
-    factor = 10**decimals
-    # Cast to float to avoid issues with Int64 etc.
-    v = pd.Series(pd.to_numeric(values, errors="coerce").astype(float))
-    arr = v.to_numpy(dtype=float)
-    # round half away from zero
-    rounded = np.sign(arr) * np.floor(np.abs(arr) * factor + 0.5) / factor
+    ikke_tall = [k for k in values.columns if not is_numeric_dtype(values[k].dtype)]
+    if not ikke_tall:
+        return values
+    tall = values.copy(deep=False)
+    for k in ikke_tall:
+        tall[k] = pd.to_numeric(values[k], errors="coerce")
+    return tall
+
+
+def _round_half_up(
+    values: pd.Series | pd.DataFrame, decimals: int = 0
+) -> pd.Series | pd.DataFrame:
+    """Kommersiell avrunding (0.5 -> 1, -0.5 -> -1), også for desimaler.
 
-    return pd.Series(rounded, index=v.index, name=v.name)
+    Fungerer på numpy-arrays, pandas-Serier og DataFrames av tall. En DataFrame
+    avrundes samlet som én todimensjonal array. Tekstverdier tolkes som tall
+    først; verdier som ikke er tall blir NaN.
+    """
+    # Cast to float to avoid issues with Int64 etc. (pd.NA blir NaN)
+    if isinstance(values, pd.DataFrame):
+        tall = _som_tall(values)
+        arr = tall.to_numpy(dtype=float, na_value=np.nan)
+        return pd.DataFrame(
+            _avrund(arr, decimals), index=tall.index, columns=tall.columns
+        )
+    tall = pd.to_numeric(values, errors="coerce")
+    if isinstance(tall, pd.Series):
+        index, name = tall.index, tall.name
+        arr = tall.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        arr = np.asarray(tall, dtype=float)
+        index, name = None, None
+    return pd.Series(_avrund(arr, decimals), index=index, name=name)
+
+
+def _avrund(arr: np.ndarray, decimals: int) -> np.ndarray:
+    """Avrunder en float-array halvt bort fra null; NaN går uendret gjennom."""
+    factor = _SKALA.get(decimals) or 10.0**decimals
+    if _HAR_NUMEXPR and arr.size >= _NUMEXPR_MIN_SIZE:
+        return ne.evaluate(
+            "where(arr < 0, -floor(-arr * factor + 0.5), floor(arr * factor + 0.5))"
+            " / factor",
+            local_dict={"arr": arr, "factor": factor},
+        )
+    scaled = np.abs(arr)
+    if decimals:
+        scaled *= factor
+    scaled += 0.5
+    np.floor(scaled, out=scaled)
+    rounded = np.copysign(scaled, arr)
+    if decimals:
+        rounded /= factor
+    return rounded
+
+
+def _round_half_up_int64(values: pd.DataFrame) -> pd.DataFrame:
+    """Avrunder til heltall og gir Int64-kolonner direkte fra den avrundede arrayen.
+
+    NaN blir ``<NA>``. Sparer ``astype("Int64")``, som ellers går gjennom
+    float-resultatet én gang til for å sjekke at verdiene er hele tall.
+    """
+    tall = _som_tall(values)
+    avrundet = _avrund(tall.to_numpy(dtype=float, na_value=np.nan), 0)
+    mangler = np.isnan(avrundet)
+    avrundet[mangler] = 0
+    if np.abs(avrundet).max(initial=0) >= 2.0**63:
+        # for store til int64: la pandas gi den vanlige feilmeldingen
+        avrundet[mangler] = np.nan
+        return pd.DataFrame(avrundet, index=tall.index, columns=tall.columns).astype(
+            "Int64"
+        )
+    heltall = avrundet.astype(np.int64)
+    return pd.DataFrame(
+        {
+            j: pd.arrays.IntegerArray(heltall[:, j], mangler[:, j])
+            for j in range(heltall.shape[1])
+        },
+        index=tall.index,
+    ).set_axis(tall.columns, axis=1)
+
+
+# dtypen hver gruppe konverteres til
+_MAL_DTYPER = {
+    "klassifikasjonsvariabel": "category",
+    "heltall": "Int64",
+    "desimaltall_1_des": "float64",
+    "desimaltall_2_des": "float64",
+    "stringvar": "string",
+    "bool_var": "boolean",
+}
 
 
 def print_instruks_konverter_dtypes() -> str:
@@ -86,59 +187,89 @@ def konverter_dtypes(
     """
     df = df.copy()
     warnings = []
+    konvertert: list[str] = []
 
     for gruppe, kolonner in dtype_mapping.items():
-        for kol in kolonner:
+        if gruppe not in _MAL_DTYPER:
+            for kol in kolonner:
+                if kol not in df.columns:
+                    warnings.append(
+                        f"Advarsel: Kolonnen '{kol}' finnes ikke i dataframen."
+                    )
+                else:
+                    warnings.append(
+                        f"Advarsel: Ukjent gruppe '{gruppe}' for kolonnen '{kol}'. Ingen konvertering utført."
+                    )
+            continue
+
+        # Hele gruppen konverteres samlet, i stedet for én kolonne av gangen
+        kols = []
+        for kol in dict.fromkeys(kolonner):
             if kol not in df.columns:
                 warnings.append(f"Advarsel: Kolonnen '{kol}' finnes ikke i dataframen.")
-                continue
-
-            if gruppe == "klassifikasjonsvariabel":
-                df[kol] = df[kol].astype("category")
-
-            elif gruppe == "heltall":
-                avrundet = _round_half_up(df[kol], decimals=0)
+            else:
+                kols.append(kol)
+        if not gruppe.startswith("desimaltall"):
+            # Kolonner som allerede har riktig dtype trenger ingen konvertering
+            # (en Int64-kolonne er allerede avrundet til heltall).
+            kols = [k for k in kols if str(df[k].dtype) != _MAL_DTYPER[gruppe]]
+        if not kols:
+            continue
+        konvertert.extend(kols)
+
+        if gruppe == "klassifikasjonsvariabel":
+            df[kols] = df[kols].astype("category")
+
+        elif gruppe == "heltall":
+            # Heltallskolonner har ingenting å avrunde og castes direkte
+            heltall = [
+                k
+                for k in kols
+                if is_integer_dtype(df[k].dtype) and not is_bool_dtype(df[k].dtype)
+            ]
+            if heltall:
+                df[heltall] = df[heltall].astype("Int64")
+            andre = [k for k in kols if k not in heltall]
+            if andre:
                 # Nullable int-type for å tillate NaN
-                df[kol] = avrundet.astype("Int64")
-
-            elif gruppe == "desimaltall_1_des":
-                df[kol] = _round_half_up(df[kol], decimals=1)
+                df[andre] = _round_half_up_int64(df[andre])
 
-            elif gruppe == "desimaltall_2_des":
-                df[kol] = _round_half_up(df[kol], decimals=2)
+        elif gruppe == "desimaltall_1_des":
+            df[kols] = _round_half_up(df[kols], decimals=1)
 
-            elif gruppe == "stringvar":
-                df[kol] = df[kol].astype("string")
+        elif gruppe == "desimaltall_2_des":
+            df[kols] = _round_half_up(df[kols], decimals=2)
 
-            elif gruppe == "bool_var":
-                # Enkel variant: anta at verdiene allerede er 0/1 eller bool
-                df[kol] = df[kol].astype("boolean")
+        elif gruppe == "stringvar":
+            df[kols] = df[kols].astype("string")
 
-            else:
-                warnings.append(
-                    f"Advarsel: Ukjent gruppe '{gruppe}' for kolonnen '{kol}'. Ingen konvertering utført."
-                )
+        elif gruppe == "bool_var":
+            # Enkel variant: anta at verdiene allerede er 0/1 eller bool
+            df[kols] = df[kols].astype("boolean")
 
     # Her kan du velge:
     # - returnere warnings,
     # - eller printe dem,
     # - eller begge deler.
     if warnings:
-        for w in warnings:
-            print(w)
+        print("\n".join(warnings))
 
     df_dtypes = df.dtypes
 
     display(df)
 
-    logger.info("ℹ️ Under ser du en oversikt over variabeltypene:\n")
-    logger.info("ℹ️ category -> klassifikasjonsvariabel")
-    logger.info("ℹ️ string[python] -> stringvariabel")
-    logger.info("ℹ️ Int64 -> heltall")
-    logger.info("ℹ️ float64 -> desimaltall")
-    logger.info("ℹ️ boolean -> booleansk variabel (1/0, ja/nei)\n")
-
     logger.info(
+        "ℹ️ Konverterte %d kolonne(r): %s\n",
+        len(konvertert),
+        ", ".join(map(str, konvertert)),
+    )
+    logger.info(
+        "ℹ️ Under ser du en oversikt over variabeltypene:\n\n"
+        "ℹ️ category -> klassifikasjonsvariabel\n"
+        "ℹ️ string[python] -> stringvariabel\n"
+        "ℹ️ Int64 -> heltall\n"
+        "ℹ️ float64 -> desimaltall\n"
+        "ℹ️ boolean -> booleansk variabel (1/0, ja/nei)\n\n"
         "ℹ️ Under ser du dtypene som kjennetegner variablene dine etter prosedyren:\n"
     )
     display(df_dtypes)
@@ -29,6 +29,61 @@ from pandas.api.types import is_integer_dtype
 
 from ssb_kostra_python import hjelpefunksjoner
 
+# Faste kolonner i endringsloggen og dtypen de får ved eksport. old_value og
+# new_value kan komme fra kolonner med ulik dtype og beholdes som object.
+# Snapshot-kolonnene id_<klassifikasjonsvariabel> kommer i tillegg.
+_LOG_SCHEMA: dict[str, Any] = {
+    "timestamp": "datetime64[s]",
+    "user": hjelpefunksjoner.STRING_DTYPE,
+    "row_id": "Int64",
+    "column": hjelpefunksjoner.STRING_DTYPE,
+    "old_value": object,
+    "new_value": object,
+    "reason": hjelpefunksjoner.STRING_DTYPE,
+}
+
+
+# Tekst som tolkes som sann/usann for boolske kolonner
+_SANN = frozenset({"true", "1", "yes", "y"})
+_USANN = frozenset({"false", "0", "no", "n"})
+
+
+class _ChangeLog:
+    """Endringslogg som lagres kolonnevis, én liste per felt.
+
+    ``append`` tar imot én loggrad som dict, slik en ``list[dict]`` gjør, men
+    uten å bygge dataframen fra en liste av dicts ved hver eksport. Den
+    eksporterte dataframen gjenbrukes til loggen endres igjen.
+    """
+
+    def __init__(self) -> None:
+        self._kolonner: dict[str, list[Any]] = {k: [] for k in _LOG_SCHEMA}
+        self._antall = 0
+        self._frame: pd.DataFrame | None = None
+
+    def __len__(self) -> int:
+        return self._antall
+
+    def append(self, entry: dict[str, Any]) -> None:
+        for k in entry:
+            if k not in self._kolonner:
+                self._kolonner[k] = [None] * self._antall
+        for k, verdier in self._kolonner.items():
+            verdier.append(entry.get(k))
+        self._antall += 1
+        self._frame = None
+
+    def to_frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            self._frame = pd.DataFrame(
+                {
+                    k: pd.array(verdier, dtype=_LOG_SCHEMA.get(k))
+                    for k, verdier in self._kolonner.items()
+                }
+            )
+        # Grunn kopi, så endringer hos mottakeren ikke når den lagrede
+        return self._frame.copy(deep=False)
+
 
 # %%
 def dataframe_cell_editor_mvp(
@@ -104,22 +159,32 @@ def dataframe_cell_editor_mvp(
         - Intended for interactive use in Jupyter environments.
     - Relies on ipywidgets and a live kernel.
     - Builds upon ``definere_klassifikasjonsvariable()`` to identify classification vs statistical variables.
+      Each editor asks again, also when it is rebuilt for the same dataframe.
     - Persistence (saving edited data or logs to disk) is intentionally left out and can be added later if needed.
     """
     # ------------------------------------------------------------------
     # Setup
     # ------------------------------------------------------------------
-    df_working = df.copy()
+    # Grunn kopi: med copy-on-write kopieres bare blokkene som faktisk endres,
+    # og df forblir uendret
+    df_working = df.copy(deep=False)
 
     ROW_ID = "__row_id__"
     if ROW_ID not in df_working.columns:
-        df_working[ROW_ID] = np.arange(len(df_working))
+        df_working[ROW_ID] = np.arange(len(df_working), dtype=np.int64)
 
     klassifikasjonsvariable, statistikkvariable = (
         hjelpefunksjoner.definere_klassifikasjonsvariable(df_working)
     )
 
-    change_log: list[dict[str, Any]] = []
+    # Oppslag fra ROW_ID til radens posisjon via hashtabell, i stedet for å
+    # sammenligne hele ROW_ID-kolonnen for hver rad som endres
+    row_id_index = pd.Index(df_working[ROW_ID])
+
+    # Mengde for raske oppslag i callbackene; listene beholdes for rekkefølgen
+    editable_cols = frozenset(statistikkvariable)
+
+    change_log = _ChangeLog()
     MAX_EDIT_ROWS = 250
 
     # ------------------------------------------------------------------
@@ -235,9 +300,9 @@ def dataframe_cell_editor_mvp(
 
         if is_bool_dtype(dtype):
             t = text.lower()
-            if t in ("true", "1", "yes", "y"):
+            if t in _SANN:
                 return True
-            if t in ("false", "0", "no", "n"):
+            if t in _USANN:
                 return False
             raise ValueError(
                 f"'{text}' is not a valid boolean (true/false/1/0/yes/no)."
@@ -247,8 +312,10 @@ def dataframe_cell_editor_mvp(
 
     def get_results() -> tuple[pd.DataFrame, pd.DataFrame]:
         """Return the full edited df and the full change log df."""
+        # Med copy-on-write (pandas >= 3) deler drop kolonnedataene med
+        # df_working; senere endringer kopierer bare blokken som endres.
         df_final = df_working.drop(columns=[ROW_ID])
-        log_df = pd.DataFrame(change_log)
+        log_df = change_log.to_frame()
         return df_final, log_df
 
     def render_results() -> None:
@@ -261,22 +328,7 @@ def dataframe_cell_editor_mvp(
 
         with log_out:
             clear_output()
-            if log_df.empty:
-                display(
-                    pd.DataFrame(
-                        columns=[
-                            "timestamp",
-                            "user",
-                            "row_id",
-                            "column",
-                            "old_value",
-                            "new_value",
-                            "reason",
-                        ]
-                    )
-                )
-            else:
-                display(log_df if log_rows is None else log_df.tail(log_rows))
+            display(log_df if log_rows is None else log_df.tail(log_rows))
 
     # Initial render (shows empty log + df head)
     render_results()
@@ -346,6 +398,9 @@ def dataframe_cell_editor_mvp(
             return
 
         col = edit_column_dd.value
+        if col not in editable_cols:
+            edit_status.value = "<b style='color:red'>Choose a column to edit.</b>"
+            return
 
         if apply_all_chk.value:
             target_rows = current_slice[ROW_ID].tolist()
@@ -365,20 +420,28 @@ def dataframe_cell_editor_mvp(
             return
 
         any_change = False
+        # Samme tidspunkt og bruker for alle radene i én commit
+        timestamp = np.datetime64(datetime.now(), "s")
+        user = getpass.getuser()
+        col_pos = df_working.columns.get_loc(col)
+        klass_pos = [df_working.columns.get_loc(k) for k in klassifikasjonsvariable]
 
         for rid in target_rows:
-            idx = df_working.index[df_working[ROW_ID] == rid][0]
-            old_val = df_working.at[idx, col]
+            # Posisjonsbasert lesing og skriving: ingen oppslag i radindeksen,
+            # og riktig rad også om indeksen har duplikater. Skriving via iat
+            # går gjennom copy-on-write, så df og tidligere eksporter er urørt.
+            pos = row_id_index.get_loc(rid)
+            old_val = df_working.iat[pos, col_pos]
 
             if (pd.isna(old_val) and pd.isna(new_val)) or (old_val == new_val):  # type: ignore[unreachable]
                 continue
 
-            df_working.at[idx, col] = new_val
+            df_working.iat[pos, col_pos] = new_val
             any_change = True
 
             log_entry = {
-                "timestamp": datetime.now().isoformat(timespec="seconds"),
-                "user": getpass.getuser(),
+                "timestamp": timestamp,
+                "user": user,
                 "row_id": int(rid),
                 "column": col,
                 "old_value": old_val,
@@ -386,8 +449,8 @@ def dataframe_cell_editor_mvp(
                 "reason": reason_box.value,
             }
 
-            for k in klassifikasjonsvariable:
-                log_entry[f"id_{k}"] = df_working.at[idx, k]
+            for k, k_pos in zip(klassifikasjonsvariable, klass_pos, strict=True):
+                log_entry[f"id_{k}"] = df_working.iat[pos, k_pos]
 
             change_log.append(log_entry)
 
@@ -13,14 +13,68 @@
 # ---
 
 # %%
+import functools
 import logging
+from collections.abc import Callable
+from typing import Any
+from typing import Literal
 
+import numpy as np
 import pandas as pd
 
 INPUT_PATCH_TARGET = "builtins.input"
 
 logger = logging.getLogger(__name__)
 
+# Arrow-backed strings give C kernels for zfill/endswith/hashing; fall back to
+# the default pandas string dtype when pyarrow is not installed.
+try:
+    import pyarrow  # noqa: F401
+
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:  # pragma: no cover
+    STRING_DTYPE = "string"
+
+# Regionskoder som bare består av sifre fylles ut med ledende nuller. Mønsteret
+# gis som tekst, så Arrow-strenger matcher det i C.
+_DIGITS_PATTERN = r"\d+"
+
+
+# %%
+def _allerede_formatert(s: pd.Series, width: int) -> bool:
+    """Sjekker om en kolonne allerede er ``STRING_DTYPE`` og minst ``width`` tegn lang.
+
+    Da ville både kastingen og utfyllingen med nuller i ``format_fil`` vært uten effekt.
+    """
+    if s.dtype != pd.api.types.pandas_dtype(STRING_DTYPE):
+        return False
+    lengder = s.str.len()
+    return bool(lengder.isna().all() or lengder.min() >= width)
+
+
+def _per_unik_verdi(
+    s: pd.Series, transform: Callable[[pd.Series], pd.Series]
+) -> pd.Series:
+    """Bruker ``transform`` på de unike verdiene i ``s`` og sprer resultatet til alle rader.
+
+    Periode- og regionkolonner har få unike verdier, så tekstoperasjonene kjøres
+    over noen hundre verdier i stedet for over hver rad. Manglende verdier
+    beholdes som ``<NA>``.
+    """
+    koder, unike = pd.factorize(s)
+    transformert = transform(pd.Series(unike, dtype=s.dtype)).array
+    return pd.Series(
+        transformert.take(koder, allow_fill=True), index=s.index, name=s.name
+    )
+
+
+def _pad_digits(s: pd.Series, width: int) -> pd.Series:
+    """Fyller ut verdier med bare sifre og færre enn ``width`` tegn med ledende nuller."""
+    # Mask: digits-only AND length < width
+    mask = s.str.fullmatch(_DIGITS_PATTERN) & (s.str.len() < width)
+    # Assign using where(...) to avoid dtype-mismatch warnings/errors
+    return s.where(~mask, other=s.str.zfill(width))
+
 
 # %%
 def format_fil(df_uformatert: pd.DataFrame) -> pd.DataFrame:
@@ -45,30 +99,30 @@ def format_fil(df_uformatert: pd.DataFrame) -> pd.DataFrame:
     Returns:
         Dataframe med formatert periode og regionvariabler.
     """
-    df_formatert = df_uformatert.copy()
+    # Grunn kopi: kolonnene erstattes under, så originalen endres ikke (copy-on-write).
+    df_formatert = df_uformatert.copy(deep=False)
 
     # --- simple fixed-width fields ---
-    if "periode" in df_formatert.columns:
-        df_formatert["periode"] = df_formatert["periode"].astype("string").str.zfill(4)
-
-    if "alder" in df_formatert.columns:
-        df_formatert["alder"] = df_formatert["alder"].astype("string").str.zfill(3)
+    for col, width in (("periode", 4), ("alder", 3)):
+        if col in df_formatert.columns and not _allerede_formatert(
+            df_formatert[col], width
+        ):
+            df_formatert[col] = _per_unik_verdi(
+                df_formatert[col].astype(STRING_DTYPE),
+                lambda u, width=width: u.str.zfill(width),
+            )
 
     # --- conditional padding helper (only digits & too short), dtype-safe ---
     def _conditional_pad(col: str, width: int) -> None:
         if col not in df_formatert.columns:
             return
-        # Ensure the actual column (not just a temp Series) is string dtype
-        df_formatert[col] = df_formatert[col].astype("string")
-
-        # Mask: digits-only AND length < width
-        mask = df_formatert[col].str.fullmatch(r"\d+") & (
-            df_formatert[col].str.len() < width
-        )
+        # Already string and wide enough: nothing to cast or pad
+        if _allerede_formatert(df_formatert[col], width):
+            return
 
-        # Assign using where(...) to avoid dtype-mismatch warnings/errors
-        df_formatert[col] = df_formatert[col].where(
-            ~mask, other=df_formatert[col].str.zfill(width)
+        # Ensure the actual column (not just a temp Series) is string dtype
+        df_formatert[col] = _per_unik_verdi(
+            df_formatert[col].astype(STRING_DTYPE), lambda u: _pad_digits(u, width)
         )
 
     # Apply to possible region columns (pad only where appropriate)
@@ -133,28 +187,23 @@ def definere_klassifikasjonsvariable(
     else:
         logger.info(f"Andre klassifikasjonsvariable: {andre_klassifikasjonsvariable}")
 
-    # Helper to deduplicate while preserving order
-    # def uniq(seq):
-    def uniq(seq: list[str]) -> list[str]:
-        seen = set()
-        out = []
-        for x in seq:
-            if x not in seen:
-                seen.add(x)
-                out.append(x)
-        return out
-
-    # Build lists while keeping order
-    klassifikasjonsvariable = uniq(
-        felles_klassifikasjonsvariable + andre_klassifikasjonsvariable
+    # Build lists while keeping order (dict.fromkeys deduplicates in one pass)
+    klassifikasjonsvariable = list(
+        dict.fromkeys(felles_klassifikasjonsvariable + andre_klassifikasjonsvariable)
     )
-    statistikkvariable = [c for c in tot_cols if c not in klassifikasjonsvariable]
+    klassifikasjonsvariable_sett = set(klassifikasjonsvariable)
+    statistikkvariable = [c for c in tot_cols if c not in klassifikasjonsvariable_sett]
 
     logger.info(f"Klassifikasjonsvariable i datasettet: {klassifikasjonsvariable}")
 
-    inputfil[klassifikasjonsvariable] = inputfil[klassifikasjonsvariable].astype(
-        "string"
-    )
+    for col in klassifikasjonsvariable:
+        if isinstance(inputfil[col].dtype, pd.StringDtype):
+            inputfil[col] = inputfil[col].astype(STRING_DTYPE)
+        else:
+            # Få unike koder: gjør hver kode om til tekst én gang, ikke hver rad
+            inputfil[col] = _per_unik_verdi(
+                inputfil[col], lambda u: u.astype(STRING_DTYPE)
+            )
 
     logger.info(f"Statistikkvariable i datasettet: {statistikkvariable}")
 
@@ -165,12 +214,181 @@ def definere_klassifikasjonsvariable(
 
 
 # %%
+SUMMERING_NEDKAST_MIN_RADER = 100_000
+
+
+def nedkaste_for_summering(
+    df: pd.DataFrame, statistikkvariable: list[str], sum_dtype: str | None
+) -> tuple[pd.DataFrame, dict[str, Any]]:
+    """Nedkaster statistikkvariablene før summering dersom brukeren ber om det.
+
+    Kastingen skjer bare når ``sum_dtype`` er satt, datasettet har flere enn
+    ``SUMMERING_NEDKAST_MIN_RADER`` rader og alle statistikkvariablene er float64.
+    ``df`` endres ikke.
+
+    Args:
+        df: Datasettet som skal summeres.
+        statistikkvariable: Kolonnene som summeres.
+        sum_dtype: Dtype det skal summeres i, f.eks. ``"float32"``. ``None`` beholder dtypene.
+
+    Returns:
+        Datasettet som skal summeres (``df`` selv dersom ingenting ble kastet) og de
+        opprinnelige dtypene for kolonnene som ble kastet, eller en tom dict.
+    """
+    if (
+        sum_dtype is None
+        or not statistikkvariable
+        or len(df) <= SUMMERING_NEDKAST_MIN_RADER
+        or not all(df[c].dtype == "float64" for c in statistikkvariable)
+    ):
+        return df, {}
+    original = {c: df[c].dtype for c in statistikkvariable}
+    return df.astype(dict.fromkeys(statistikkvariable, sum_dtype)), original
+
+
+# %%
+def _gruppekoder(df: pd.DataFrame, keys: list[str]) -> tuple[np.ndarray, int]:
+    """Gir hver rad en gruppekode 0..n-1 i rekkefølgen gruppene først dukker opp.
+
+    Forutsetter at ingen av nøklene har manglende verdier.
+    """
+    koder = np.zeros(len(df), dtype=np.int64)
+    antall = 1
+    for key in keys:
+        key_koder, uniques = pd.factorize(df[key])
+        # Faktoriserer den sammensatte koden på nytt så den holder seg kompakt
+        koder, kombinasjoner = pd.factorize(koder * len(uniques) + key_koder)
+        antall = len(kombinasjoner)
+    return koder, antall
+
+
+@functools.cache
+def _numba_gruppesum() -> Callable[[np.ndarray, np.ndarray, np.ndarray], None]:
+    """Kompilerer summeringskjernen første gang ``engine="numba"`` brukes."""
+    try:
+        import numba
+    except ImportError as e:
+        raise ImportError(
+            "engine='numba' krever at pakken 'numba' er installert."
+        ) from e
+
+    # Ikke parallel=True: flere tråder som legger til i samme gruppe ville kollidert.
+    @numba.njit
+    def gruppesum(koder: np.ndarray, verdier: np.ndarray, summer: np.ndarray) -> None:
+        for i in range(len(koder)):
+            verdi = verdier[i]
+            if verdi == verdi:  # hopper over NaN, som pandas
+                summer[koder[i]] += verdi
+
+    return gruppesum
+
+
+def summere_grupper(
+    df: pd.DataFrame,
+    keys: list[str],
+    statistikkvariable: list[str],
+    engine: Literal["numpy", "numba"] = "numpy",
+) -> pd.DataFrame:
+    """Summerer statistikkvariablene per gruppe uten å gå via pandas groupby.
+
+    Gir samme resultat som ``df.groupby(keys, as_index=False, observed=True,
+    sort=False)[statistikkvariable].sum()``. Kolonner som ikke er vanlige numpy
+    heltall eller flyttall (f.eks. nullable ``Int64``) summeres med pandas.
+
+    Args:
+        df: Datasettet som skal summeres.
+        keys: Klassifikasjonsvariablene det grupperes på.
+        statistikkvariable: Kolonnene som summeres.
+        engine: ``"numpy"`` summerer med ``np.bincount``/``np.add.at``. ``"numba"``
+            bruker en kompilert løkke og krever at numba er installert.
+
+    Returns:
+        Én rad per gruppe, i rekkefølgen gruppene først dukker opp.
+    """
+    if not keys or not all(
+        isinstance(df[c].dtype, np.dtype) and df[c].dtype.kind in "iuf"
+        for c in statistikkvariable
+    ):
+        return df.groupby(keys, as_index=False, observed=True, sort=False)[
+            statistikkvariable
+        ].sum()
+    gruppesum = _numba_gruppesum() if engine == "numba" else None
+
+    # Som groupby(dropna=True): rader med manglende nøkkelverdi summeres ikke
+    komplette = df[keys].notna().all(axis=1)
+    if not komplette.all():
+        df = df[komplette]
+    koder, antall = _gruppekoder(df, keys)
+
+    # Første rad i hver gruppe gir nøkkelverdiene, med dtypene i behold
+    _, forste = np.unique(koder, return_index=True)
+    resultat = df[keys].take(forste).reset_index(drop=True)
+    for col in statistikkvariable:
+        verdier = df[col].to_numpy()
+        if verdier.dtype.kind == "f":
+            akkumulator: type[np.generic] = np.float64
+        elif verdier.dtype.kind == "u":
+            akkumulator = np.uint64
+        else:
+            akkumulator = np.int64
+        if gruppesum is not None:
+            summer = np.zeros(antall, dtype=akkumulator)
+            gruppesum(koder, verdier, summer)
+        elif akkumulator is np.float64:
+            summer = np.bincount(
+                koder, weights=np.nan_to_num(verdier, nan=0.0), minlength=antall
+            )
+        else:
+            summer = np.zeros(antall, dtype=akkumulator)
+            np.add.at(summer, koder, verdier)
+        resultat[col] = _tilbake_til_dtype(summer, verdier.dtype)
+    return resultat
+
+
+def _tilbake_til_dtype(summer: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """Caster summene tilbake til kolonnens dtype når alle summene får plass.
+
+    Som pandas groupby: smale heltall (f.eks. ``int8``) som ville flyte over,
+    beholdes i akkumulatorens ``int64``/``uint64`` i stedet for å bli feil.
+    """
+    if dtype.kind in "iu" and summer.size:
+        grenser = np.iinfo(dtype)
+        if summer.min() < grenser.min or summer.max() > grenser.max:
+            return summer
+    return summer.astype(dtype, copy=False)
+
+
+# %%
+def _bare_tekst(s: pd.Series) -> bool:
+    """Sjekker om alle verdiene i kolonnen er tekst, slik at ``.str`` kan brukes direkte."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return pd.api.types.infer_dtype(s.cat.categories, skipna=True) == "string"
+    if s.dtype == object:
+        return pd.api.types.infer_dtype(s, skipna=True) == "string"
+    return pd.api.types.is_string_dtype(s.dtype)
+
+
+def _har_komma(s: pd.Series) -> bool:
+    """Sjekker om minst én verdi i kolonnen inneholder komma."""
+    if _bare_tekst(s):
+        return bool(s.str.contains(",", regex=False, na=False).any())
+    # Blandede object-kolonner og kategorier med tall sjekkes som tekst
+    return bool(s.astype(str).str.contains(",", regex=False).any())
+
+
 def konvertere_komma_til_punktdesimal(inputfil: pd.DataFrame) -> pd.DataFrame:
     """Konvertere komma til punktdesimal i datasettet."""
-    df = inputfil.copy()
-    cols_with_commas = [
-        col for col in df.columns if df[col].astype(str).str.contains(",").any()
+    # Grunn kopi: bare kolonnene med komma erstattes (copy-on-write)
+    df = inputfil.copy(deep=False)
+    # Bare tekst-, object- og kategorikolonner kan inneholde komma; tall,
+    # datoer o.l. sjekkes ikke
+    kandidater = [
+        col
+        for col in df.columns
+        if pd.api.types.is_string_dtype(df[col].dtype)
+        or isinstance(df[col].dtype, pd.CategoricalDtype)
     ]
-    for col in cols_with_commas:
-        df[col] = df[col].str.replace(",", ".", regex=False).astype(float)
+    for col in kandidater:
+        if _har_komma(df[col]):
+            df[col] = df[col].str.replace(",", ".", regex=False).astype(float)
     return df
@@ -4,68 +4,92 @@ from typing import Any
 import pandas as pd
 
 
-def _select_mapping(
-    aggregeringstype: str | None, region_col: str, periode: str | int
-) -> tuple[
-    pd.DataFrame,
-    str,
+def _post_filter_kommuner_til_fylke(df: pd.DataFrame) -> pd.DataFrame:
+    return df[df["kommuneregion"].str.endswith("00")]
+
+
+_VALID_BY_REGION: dict[str, frozenset[str]] = {
+    "kommuneregion": frozenset({"kommune_til_landet", "kommune_til_fylkeskommune"}),
+    "fylkesregion": frozenset({"fylkeskommune_til_kostraregion"}),
+    "bydelsregion": frozenset({"bydeler_til_EAB"}),
+}
+
+_DEFAULT_BY_REGION: dict[str, str] = {
+    "kommuneregion": "kommune_til_landet",
+    "fylkesregion": "fylkeskommune_til_kostraregion",
+    "bydelsregion": "bydeler_til_EAB",
+}
+
+# aggregeringstype -> (mapping function, join_col, replace_col, post_filter, rename_cols).
+# The mapping functions are looked up by name at call time so they can be patched.
+_DISPATCH: dict[
     str,
-    Callable[[pd.DataFrame], pd.DataFrame] | None,
-    dict[str, str],
-]:
-    valid_by_region = {
-        "kommuneregion": {"kommune_til_landet", "kommune_til_fylkeskommune"},
-        "fylkesregion": {"fylkeskommune_til_kostraregion"},
-        "bydelsregion": {"bydeler_til_EAB"},
-    }
+    tuple[
+        str,
+        str,
+        str,
+        Callable[[pd.DataFrame], pd.DataFrame] | None,
+        dict[str, str],
+    ],
+] = {
+    "kommune_til_landet": (
+        "mapping_fra_kommune_til_landet",
+        "kommuneregion",
+        "kommuneregion",
+        None,
+        {},
+    ),
+    "kommune_til_fylkeskommune": (
+        "mapping_fra_kommune_til_fylkeskommune",
+        "kommuneregion",
+        "kommuneregion",
+        _post_filter_kommuner_til_fylke,
+        {"kommuneregion": "fylkesregion"},
+    ),
+    "fylkeskommune_til_kostraregion": (
+        "mapping_fra_fylkeskommune_til_kostraregion",
+        "fylkesregion",
+        "fylkesregion",
+        None,
+        {},
+    ),
+    "bydeler_til_EAB": (
+        "mapping_bydeler_oslo",
+        "bydelsregion",
+        "bydelsregion",
+        None,
+        {},
+    ),
+}
+
+
+def _resolve_aggregeringstype(aggregeringstype: str | None, region_col: str) -> str:
     if aggregeringstype is None:
-        if region_col == "kommuneregion":
-            aggregeringstype = "kommune_til_landet"
-        elif region_col == "fylkesregion":
-            aggregeringstype = "fylkeskommune_til_kostraregion"
-        else:
-            aggregeringstype = "bydeler_til_EAB"
-    allowed = valid_by_region.get(region_col, set())
+        aggregeringstype = _DEFAULT_BY_REGION.get(region_col, "bydeler_til_EAB")
+    allowed = _VALID_BY_REGION.get(region_col, frozenset())
     if aggregeringstype not in allowed:
         raise ValueError(
             f"Inkonsekvent valg: aggregeringstype='{aggregeringstype}' passer ikke med regionkolonne '{region_col}'. "
             f"Tillatte valg for {region_col}: {sorted(allowed)}."
         )
-    if aggregeringstype == "kommune_til_landet":
-        return (
-            mapping_fra_kommune_til_landet(periode),
-            "kommuneregion",
-            "kommuneregion",
-            None,
-            {},
-        )
-    if aggregeringstype == "kommune_til_fylkeskommune":
+    return aggregeringstype
 
-        def _post_filter_kommuner_til_fylke(df: pd.DataFrame) -> pd.DataFrame:
-            return df[df["kommuneregion"].str.endswith("00")]
 
-        return (
-            mapping_fra_kommune_til_fylkeskommune(periode),
-            "kommuneregion",
-            "kommuneregion",
-            _post_filter_kommuner_til_fylke,
-            {"kommuneregion": "fylkesregion"},
-        )
-    if aggregeringstype == "fylkeskommune_til_kostraregion":
-        return (
-            mapping_fra_fylkeskommune_til_kostraregion(periode),
-            "fylkesregion",
-            "fylkesregion",
-            None,
-            {},
-        )
-    if aggregeringstype == "bydeler_til_EAB":
-        return mapping_bydeler_oslo(periode), "bydelsregion", "bydelsregion", None, {}
-    raise ValueError(
-        f"Ukjent aggregeringstype: {aggregeringstype}. "
-        "Gyldige: 'kommune_til_landet', 'kommune_til_fylkeskommune', "
-        "'fylkeskommune_til_kostraregion', 'bydeler_til_EAB'."
-    )
+def _select_mapping(
+    aggregeringstype: str | None, region_col: str, periode: str | int
+) -> tuple[
+    pd.DataFrame,
+    str,
+    str,
+    Callable[[pd.DataFrame], pd.DataFrame] | None,
+    dict[str, str],
+]:
+    aggregeringstype = _resolve_aggregeringstype(aggregeringstype, region_col)
+    mapping_fn_name, join_col, replace_col, post_filter, rename_cols = _DISPATCH[
+        aggregeringstype
+    ]
+    mapping_fn: Callable[[str | int], pd.DataFrame] = globals()[mapping_fn_name]
+    return mapping_fn(periode), join_col, replace_col, post_filter, dict(rename_cols)
 
 
 def _validate_and_normalize_region_col(df: pd.DataFrame) -> tuple[str, pd.DataFrame]:
@@ -82,12 +106,13 @@ def _validate_and_normalize_region_col(df: pd.DataFrame) -> tuple[str, pd.DataFr
                 f"Fant flere regionskolonner {region_cols}. Det skal være nøyaktig én."
             )
     col = region_cols[0]
+    region_values = df[col].astype(hjelpefunksjoner.STRING_DTYPE)
     if col == "kommuneregion":
-        df[col] = df[col].astype(str).str.zfill(4)
+        df[col] = region_values.str.zfill(4)
     elif col == "fylkesregion":
-        df[col] = df[col].astype(str).str.zfill(4)
+        df[col] = region_values.str.zfill(4)
     else:
-        df[col] = df[col].astype(str).str.zfill(6)
+        df[col] = region_values.str.zfill(6)
     return col, df
 
 
@@ -111,15 +136,18 @@ def _print_dtype_report(
     final: dict[str, Any],
     cols: list[str],
 ) -> None:
-    print("\nOriginal dtypes:")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    buf = io.StringIO()
+    buf.write("\nOriginal dtypes:\n")
     for c, dt in original.items():
-        print(f"  {c}: {dt}")
-    print("\nPost-op (pre-restore) dtypes:")
+        buf.write(f"  {c}: {dt}\n")
+    buf.write("\nPost-op (pre-restore) dtypes:\n")
     for c, dt in post_op.items():
-        print(f"  {c}: {dt}")
-    print("\nFinal dtypes (after restore):")
+        buf.write(f"  {c}: {dt}\n")
+    buf.write("\nFinal dtypes (after restore):\n")
     for c, dt in final.items():
-        print(f"  {c}: {dt}")
+        buf.write(f"  {c}: {dt}\n")
     post_changes = {
         c: (original[c], post_op[c]) for c in cols if original[c] != post_op[c]
     }
@@ -127,17 +155,18 @@ def _print_dtype_report(
         c: (original[c], final[c]) for c in cols if original[c] != final[c]
     }
     if post_changes:
-        print("\nDtype changes caused by the operation (original -> post-op):")
+        buf.write("\nDtype changes caused by the operation (original -> post-op):\n")
         for c, (o, p) in post_changes.items():
-            print(f"  {c}: {o} -> {p}")
+            buf.write(f"  {c}: {o} -> {p}\n")
     else:
-        print("\nNo dtype changes caused by the operation.")
+        buf.write("\nNo dtype changes caused by the operation.\n")
     if final_changes:
-        print("\nDtype changes remaining after restoration (original -> final):")
+        buf.write("\nDtype changes remaining after restoration (original -> final):\n")
         for c, (o, f) in final_changes.items():
-            print(f"  {c}: {o} -> {f}")
+            buf.write(f"  {c}: {o} -> {f}\n")
     else:
-        print("\nNo dtype changes remain after restoration.")
+        buf.write("\nNo dtype changes remain after restoration.\n")
+    logger.info(buf.getvalue())
 
 
 def _restore_dtype(result: Any, orig: Any) -> Any:
@@ -172,6 +201,7 @@ def _restore_dtype(result: Any, orig: Any) -> Any:
 # ---
 
 # %%
+import io
 import logging
 from typing import Any
 from typing import cast
@@ -410,7 +440,9 @@ def mapping_fra_fylkeskommune_til_kostraregion(year: str | int) -> pd.DataFrame:
 # %%
 # def hierarki_mapping(inputfil: pd.DataFrame, aggregeringstype: str | None = None) -> pd.DataFrame:
 def hierarki(
-    inputfil: pd.DataFrame, aggregeringstype: str | None = None
+    inputfil: pd.DataFrame,
+    aggregeringstype: str | None = None,
+    sum_dtype: str | None = None,
 ) -> pd.DataFrame:
     """Hierarkisk aggregering.
 
@@ -467,6 +499,11 @@ def hierarki(
         - fylkesregion  -> ``"fylkeskommune_til_kostraregion"``
         - bydelsregion  -> ``"bydeler_til_EAB"``
 
+    sum_dtype : str | None
+        Valgfritt. Sett f.eks. ``"float32"`` for å summere store datasett (over 100 000 rader)
+        med float64-statistikkvariabler i halv presisjon. Dtypene gjenopprettes etter summeringen.
+        ``None`` (standard) summerer i opprinnelig dtype.
+
     Returnerer
     ----------
     pandas.DataFrame
@@ -480,25 +517,56 @@ def hierarki(
     if inputfil_copy["periode"].nunique() > 1:
         raise KeyError("Mer enn 1 periode i datasettet")
     inputfil_copy["periode"] = inputfil_copy["periode"].astype(str)
-    periode = inputfil_copy["periode"].unique()[0]
-    print("Periode:")
-    print(periode)
 
     region_col, inputfil_copy = _validate_and_normalize_region_col(inputfil_copy)
 
+    # Nothing to aggregate: skip the KLASS lookup, merge and groupby entirely.
+    if inputfil_copy.empty:
+        _, _, _, _, rename_cols = _DISPATCH[
+            _resolve_aggregeringstype(aggregeringstype, region_col)
+        ]
+        return inputfil_copy.rename(columns=rename_cols)
+
+    periode = inputfil_copy["periode"].unique()[0]
+    logger.info("Periode: %s", periode)
+
     mappingfil, join_col, replace_col, post_filter, rename_cols = _select_mapping(
         aggregeringstype, region_col, periode
     )
-    df_merged = inputfil_copy.merge(
-        mappingfil, left_on=join_col, right_on="from", how="inner"
+    mappingfil = mappingfil.astype(
+        {"from": hjelpefunksjoner.STRING_DTYPE, "to": hjelpefunksjoner.STRING_DTYPE}
     )
+    # Keep only the mapping rows for regions present in the data, so the merge
+    # builds its hash table over the smaller set of keys.
+    mappingfil = mappingfil[mappingfil["from"].isin(inputfil_copy[join_col].unique())]
+
     klassifikasjonsvariable, statistikkvariable = (
         hjelpefunksjoner.definere_klassifikasjonsvariable(inputfil_copy)
     )
+
+    # No region in the data is part of the hierarchy (e.g. the file is already
+    # aggregated): the merge would be empty, so return the input as is, with the
+    # classification columns cast the same way as on the aggregating path.
+    if mappingfil.empty:
+        logger.info(
+            "Ingen av regionene i datasettet finnes i mappingfilen. Ingen aggregering utføres."
+        )
+        return _postprocess_combined(
+            inputfil_copy, post_filter, rename_cols, klassifikasjonsvariable
+        )
+
+    df_merged = inputfil_copy.merge(
+        mappingfil, left_on=join_col, right_on="from", how="inner"
+    )
     df_merged[replace_col] = df_merged["to"]
-    df_agg = df_merged.groupby(klassifikasjonsvariable, as_index=False, observed=True)[
-        statistikkvariable
-    ].sum()
+    df_merged, original_dtypes = hjelpefunksjoner.nedkaste_for_summering(
+        df_merged, statistikkvariable, sum_dtype
+    )
+    df_agg = df_merged.groupby(
+        klassifikasjonsvariable, as_index=False, observed=True, sort=False
+    )[statistikkvariable].sum()
+    for c, dt in original_dtypes.items():
+        df_agg[c] = _restore_dtype(df_agg[c], dt)
     df_combined = pd.concat([inputfil_copy, df_agg], ignore_index=True)
     return _postprocess_combined(
         df_combined, post_filter, rename_cols, klassifikasjonsvariable
@@ -533,8 +601,7 @@ def overfore_data_fra_fk_til_k(inputfil: pd.DataFrame) -> pd.DataFrame:
     hjelpefunksjoner.konvertere_komma_til_punktdesimal(inputfil)
     hjelpefunksjoner.format_fil(inputfil)
     mappingfil: pd.DataFrame = mapping_fra_kommune_til_fylkeskommune(year)
-    mappingfil[["from", "to"]] = mappingfil[["to", "from"]]
-    mappingfil = mappingfil.copy()
+    mappingfil = mappingfil.rename(columns={"from": "to", "to": "from"})
     mappingfil["from"] = mappingfil["from"].astype(str).str.zfill(4)
     mappingfil["to"] = mappingfil["to"].astype(str).str.zfill(4)
 
@@ -542,7 +609,6 @@ def overfore_data_fra_fk_til_k(inputfil: pd.DataFrame) -> pd.DataFrame:
         inputfil, left_on="from", right_on="fylkesregion", how="left"
     )
 
-    df_merged = df_merged.rename(columns={"to": "kommuneregion"})
     df_merged = df_merged.rename(columns={"to": "kommuneregion"}).drop(
         columns=["fylkesregion", "from"]
     )
@@ -13,51 +13,94 @@
 # ---
 
 # %%
+import logging
+from typing import Any
+from typing import Literal
+
 import pandas as pd
+from pandas.api.types import is_object_dtype
+from pandas.api.types import is_string_dtype
 
 from ssb_kostra_python import hjelpefunksjoner
 
+logger = logging.getLogger(__name__)
+
 
 # %%
-def summere_over_kjonn(inputfil: pd.DataFrame) -> pd.DataFrame:
+def summere_over_kjonn(
+    inputfil: pd.DataFrame,
+    sum_dtype: str | None = None,
+    engine: Literal["cython", "numba"] | None = None,
+) -> pd.DataFrame:
     """Summér statistikkvariabler over kjønn hvis 'kjonn' finnes i datasettet.
 
     Args:
         inputfil: Datasettet som skal summeres.
+        sum_dtype: Valgfri dtype (f.eks. ``"float32"``) å summere store float64-datasett i.
+            Dtypene gjenopprettes etter summeringen. ``None`` summerer i opprinnelig dtype.
+        engine: ``"numba"`` summerer med en kompilert løkke (krever numba) i stedet for
+            pandas groupby. ``None`` eller ``"cython"`` bruker pandas, som før.
 
     Returns:
         Datasettet summert over kjønn, eller originalt datasett hvis 'kjonn' ikke finnes.
     """
     if "kjonn" not in inputfil.columns:
-        print(
+        logger.info(
             "Kjønn er ikke en klassifikasjonsvariabel i datasettet. Ingen summering utføres."
         )
         return inputfil  # or return None, depending on your pipeline design
 
-    inputfil_copy = inputfil.copy()
-    print("Kjønn er en klassifikasjonsvariabel i datasettet.")
+    logger.info("Kjønn er en klassifikasjonsvariabel i datasettet.")
 
+    # Grunn kopi: definere_klassifikasjonsvariable gjør klassifikasjonsvariablene
+    # om til tekst på stedet, og det skal ikke nå fram til innsenderens dataframe
+    # (copy-on-write kopierer bare kolonnene som erstattes).
+    inputfil = inputfil.copy(deep=False)
     summeringsvariabel = ["kjonn"]
     alle_variable = inputfil.columns.tolist()
     _klassifikasjonsvariable, statistikkvariable = (
         hjelpefunksjoner.definere_klassifikasjonsvariable(inputfil)
     )
-    groupby_variable = [
-        x
-        for x in alle_variable
-        if x not in summeringsvariabel and x not in statistikkvariable
-    ]
-
-    print(
-        f"Summerer statistikkvariablen(e) {statistikkvariable} over variablene {summeringsvariabel}."
+    ekskluderte_variable = set(summeringsvariabel) | set(statistikkvariable)
+    groupby_variable = [x for x in alle_variable if x not in ekskluderte_variable]
+
+    logger.info(
+        "Summerer statistikkvariablen(e) %s over variablene %s.",
+        statistikkvariable,
+        summeringsvariabel,
     )
 
-    summert_over_kjonn = inputfil_copy.groupby(
-        groupby_variable, as_index=False, observed=True
-    )[statistikkvariable].sum()
+    # groupby().sum() allocates a new frame, so the copy above is not modified either.
+    df_summering, original_dtypes = hjelpefunksjoner.nedkaste_for_summering(
+        inputfil, statistikkvariable, sum_dtype
+    )
+    tekstnokler: dict[str, Any] = {}
+    if engine == "numba":
+        # Nøklene faktoriseres direkte, så de trenger ikke gjøres om til kategorier.
+        summert_over_kjonn = hjelpefunksjoner.summere_grupper(
+            df_summering, groupby_variable, statistikkvariable, engine="numba"
+        )
+    else:
+        # Tekstnøkler grupperes som kategorier (heltallskoder); dtypene settes tilbake etterpå.
+        tekstnokler = {
+            c: df_summering[c].dtype
+            for c in groupby_variable
+            if is_object_dtype(df_summering[c]) or is_string_dtype(df_summering[c])
+        }
+        if tekstnokler:
+            df_summering = df_summering.astype(dict.fromkeys(tekstnokler, "category"))
+        summert_over_kjonn = df_summering.groupby(
+            groupby_variable, as_index=False, observed=True, sort=False
+        )[statistikkvariable].sum()
+    if original_dtypes or tekstnokler:
+        summert_over_kjonn = summert_over_kjonn.astype(
+            {**tekstnokler, **original_dtypes}
+        )
 
-    print(f"Datasettet har blitt summert over {summeringsvariabel}.")
-    print(f"Statistikkvariabelen(e) som har blitt summert er {statistikkvariable}.")
+    logger.info("Datasettet har blitt summert over %s.", summeringsvariabel)
+    logger.info(
+        "Statistikkvariabelen(e) som har blitt summert er %s.", statistikkvariable
+    )
 
     return summert_over_kjonn
 
@@ -16,16 +16,17 @@
 import logging
 
 import pandas as pd
-from IPython.display import display  # for nice tables in notebooks
+import pyarrow as pa
+import pyarrow.compute as pc
 
-logger = logging.getLogger(__name__)
-INPUT_PATCH_TARGET = "builtins.input"
 from ssb_kostra_python import hjelpefunksjoner
 
+logger = logging.getLogger(__name__)
+
 
 # %%
 def summere_til_aldersgrupperinger(
-    inputfil: pd.DataFrame, hierarki_path: str
+    inputfil: pd.DataFrame, hierarki_path: str, verbose: bool = False
 ) -> tuple[list[str], list[str], pd.DataFrame]:
     """Aggregerer individbaserte aldersverdier til forhåndsdefinerte aldersgrupper.
 
@@ -59,6 +60,9 @@ def summere_til_aldersgrupperinger(
         - ``from``    : alder (finmaskert nivå)
         - ``to``      : aldersgruppe
 
+    verbose : bool, default False
+        Viser de første radene av resultatet i notebooken når ``True``.
+
     Returverdier
     ------------
     rename_variabel : list[str]
@@ -81,29 +85,50 @@ def summere_til_aldersgrupperinger(
     - Aldershierarkiet forventes å være entydig per periode og alder.
     - Funksjonen forutsetter at hjelpefunksjoner håndterer korrekt identifikasjon av klassifikasjons- og statistikkvariabler.
     """
-    aldershierarki = pd.read_parquet(hierarki_path)
-    logger.info("Formatting hierarchy file.")
-    aldershierarki = hjelpefunksjoner.format_fil(aldershierarki)
-    print("")
-    inputfil_copy = inputfil.copy()
     # Ensure correct types and formatting for merging
     # Sørger for at formatet på klassifikasjonsvariablene er "string"
+    # format_fil returnerer en ny dataframe, så inputfil endres ikke.
     logger.info("Formatting input file.")
-    inputfil_copy_formatted = hjelpefunksjoner.format_fil(inputfil_copy)
-    print("")
+    inputfil_copy_formatted = hjelpefunksjoner.format_fil(inputfil)
+    # Koblingen legger bare til "to", så variablene kan defineres én gang ut fra
+    # kolonnene alene (en tom ramme) i stedet for å skanne hele det koblede datasettet.
+    klassifikasjonsvariable, statistikkvariable = (
+        hjelpefunksjoner.definere_klassifikasjonsvariable(
+            inputfil_copy_formatted.iloc[:0].assign(
+                to=pd.Series(dtype=hjelpefunksjoner.STRING_DTYPE)
+            )
+        )
+    )
     # Filter mapping to only include the year(s) present in the main dataset
     # Henter ut det ene året som ligger i folketallsfilen
-    available_years = inputfil_copy["periode"].unique()
-    # Skiller ut det året i folketallsfilen i aldershierarkifilen
-    # aldershierarki["periode"] = aldershierarki["periode"].astype(str)
-    aldershierarki_filtered = aldershierarki[
-        aldershierarki["periode"].isin(available_years)
-    ].copy()
-    aldershierarki_filtered = aldershierarki_filtered[["periode", "from", "to"]]
+    available_years = inputfil_copy_formatted["periode"].dropna().unique().tolist()
+    # Leser kun kolonnene og årene vi trenger fra hierarkifilen. periode castes
+    # til tekst i filteret slik at det virker enten fila lagrer året som tall
+    # eller som tekst.
+    aldershierarki = pd.read_parquet(
+        hierarki_path,
+        columns=["periode", "from", "to"],
+        filters=pc.field("periode").cast(pa.string()).isin(available_years),
+        engine="pyarrow",
+    )
+    logger.info("Formatting hierarchy file.")
+    aldershierarki = hjelpefunksjoner.format_fil(aldershierarki)
+    # Skiller ut det året i folketallsfilen i aldershierarkifilen. Filteret i
+    # read_parquet har normalt gjort jobben, så radene kopieres bare ved behov.
+    i_aktuelle_aar = aldershierarki["periode"].isin(available_years)
+    if i_aktuelle_aar.all():
+        aldershierarki_filtered = aldershierarki[["periode", "from", "to"]]
+    else:
+        aldershierarki_filtered = aldershierarki.loc[
+            i_aktuelle_aar, ["periode", "from", "to"]
+        ]
     # Convert 'from' to 3-digit strings for joining
     # Setter "from" i hierarkifilen som klassifikasjonsvariabel
+    # Arrow-backed strings let zfill run as a native kernel over the whole column
     aldershierarki_filtered["from"] = (
-        aldershierarki_filtered["from"].astype(str).str.zfill(3)
+        aldershierarki_filtered["from"]
+        .astype(hjelpefunksjoner.STRING_DTYPE)
+        .str.zfill(3)
     )
     # Merge the main data with the mapping on periode and alder ('from')
     # Slår sammen folketallsfilen og hierarkifilen for det aktuelle året
@@ -115,10 +140,6 @@ def summere_til_aldersgrupperinger(
     )
     df_merged = df_merged.drop(columns=["from"])
 
-    klassifikasjonsvariable, statistikkvariable = (
-        hjelpefunksjoner.definere_klassifikasjonsvariable(df_merged)
-    )
-
     # Group by cohort and region, summing the persons
     # Genererer datasett kun med antall summert på aldersgrupperinger
     rename_variabel = ["alder"]
@@ -128,17 +149,25 @@ def summere_til_aldersgrupperinger(
     )
     logger.info(f"groupby_variable: {groupby_variable}")
 
-    df_cohorts = (
-        df_merged.groupby(groupby_variable, as_index=False)[statistikkvariable]
-        .sum()
-        .rename(columns={"to": "alder"})
+    # Grupperingsnøklene gjøres om til tekst før summeringen, slik at koder som
+    # 1 og "1" i samme kolonne havner i samme gruppe.
+    df_merged[groupby_variable] = df_merged[groupby_variable].astype(
+        hjelpefunksjoner.STRING_DTYPE
     )
+    df_cohorts = hjelpefunksjoner.summere_grupper(
+        df_merged, groupby_variable, statistikkvariable
+    ).rename(columns={"to": "alder"})
 
     # Concatenate original and cohort-aggregated data
     # Slår sammen den opprinnelige folketallsfilen med folketallsfilen med aggregerte aldersgrupper
     df_combined = pd.concat([inputfil_copy_formatted, df_cohorts], ignore_index=True)
 
-    display(df_combined)
+    logger.debug("Datatyper i resultatet:\n%s", df_combined.dtypes)
+    if verbose:
+        # IPython importeres bare når resultatet faktisk skal vises
+        from IPython.display import display
+
+        display(df_combined.head())
     return rename_variabel, groupby_variable, df_combined
 
 
@@ -13,11 +13,16 @@
 
 # %%
 
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import Literal
 
+import numpy as np
 import pandas as pd
 from klass import KlassClassification
 
+from ssb_kostra_python.hjelpefunksjoner import STRING_DTYPE
+
 # %%
 """Fest navn/tittel til klassifikasjonskoder basert på KLASS.
 
@@ -87,15 +92,19 @@ def _pick_level_columns(
     return level, mcode, mname
 
 
-def _fetch_mapping_for_year(
+@functools.lru_cache(maxsize=128)
+def _fetch_mapping_arrays(
     klass_id: int,
     year: int,
-    *,
-    language: Literal["nb", "nn", "en"] = "nb",
-    include_future: bool = True,
+    language: Literal["nb", "nn", "en"],
+    include_future: bool,
     select_level: int,
-) -> tuple[pd.DataFrame, int]:
-    """Return a 2-col DF: ['_map_code','_map_name'] and the level used."""
+) -> tuple[tuple[str, ...], tuple[str, ...], int]:
+    """Fetch one KLASS mapping and return it as immutable (codes, names, level).
+
+    Cached per process so reruns in a notebook do not hit the KLASS API again.
+    Clear with ``_fetch_mapping_arrays.cache_clear()``.
+    """
     from_date = f"{year}-01-01"
     to_date = f"{year}-12-31"
 
@@ -112,30 +121,57 @@ def _fetch_mapping_for_year(
     pivot = codes.pivot_level()
     level, mcode, mname = _pick_level_columns(pivot, select_level)
 
-    mapping = pivot[[mcode, mname]].rename(
-        columns={mcode: "_map_code", mname: "_map_name"}
-    )
     # No zero-padding per requirement; compare as plain strings
-    mapping["_map_code"] = mapping["_map_code"].astype(str).str.strip()
-    mapping["_map_name"] = mapping["_map_name"].astype(str)
+    map_codes = tuple(pivot[mcode].astype(str).str.strip())
+    map_names = tuple(pivot[mname].astype(str))
+    return map_codes, map_names, level
+
+
+def _fetch_mapping_for_year(
+    klass_id: int,
+    year: int,
+    *,
+    language: Literal["nb", "nn", "en"] = "nb",
+    include_future: bool = True,
+    select_level: int,
+) -> tuple[pd.DataFrame, int]:
+    """Return a 2-col DF: ['_map_code','_map_name'] and the level used."""
+    map_codes, map_names, level = _fetch_mapping_arrays(
+        int(klass_id), int(year), language, include_future, select_level
+    )
+    mapping = pd.DataFrame({"_map_code": map_codes, "_map_name": map_names})
     return mapping, level
 
 
-def _attach_one_mapping(
-    df_in: pd.DataFrame,
+def _normalise_codes(codes: pd.Series) -> pd.Series:
+    """Codes are compared to KLASS as plain, stripped strings."""
+    # Arrow-backed strings strip with a native kernel; text columns are stripped as-is
+    if not isinstance(codes.dtype, pd.StringDtype):
+        codes = codes.astype(STRING_DTYPE)
+    return codes.str.strip()
+
+
+def _factorize_codes(codes_str: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    """Hash the codes once: one integer per row (-1 for missing) and the unique codes."""
+    return pd.factorize(codes_str)
+
+
+def _map_codes(
+    codes_str: pd.Series,
     *,
+    factorized: tuple[np.ndarray, pd.Index] | None = None,
     year: int,
     code_col: str,
     klass_id: int,
-    name_col_out: str | None = None,
     language: Literal["nb", "nn", "en"] = "nb",
     include_future: bool = True,
     select_level: int,
-) -> tuple[pd.DataFrame, dict[str, Any]]:
-    """Attach names for one (code_col, klass_id) pair; returns new df and diagnostics."""
-    if code_col not in df_in.columns:
-        raise ValueError(f"Column '{code_col}' not found in DataFrame.")
+) -> tuple[pd.Series, dict[str, Any]]:
+    """Look up names for already normalised codes; returns the names and diagnostics.
 
+    Pass ``factorized`` from ``_factorize_codes`` to reuse it across several lookups
+    on the same column.
+    """
     mapping, level_used = _fetch_mapping_for_year(
         klass_id=klass_id,
         year=year,
@@ -143,30 +179,25 @@ def _attach_one_mapping(
         include_future=include_future,
         select_level=select_level,
     )
+    lookup = dict(zip(mapping["_map_code"], mapping["_map_name"], strict=True))
 
-    df = df_in.copy()
-    df[code_col] = df[code_col].astype(str).str.strip()
-    merged = df.merge(mapping, how="left", left_on=code_col, right_on="_map_code")
-
-    if name_col_out is None:
-        name_col_out = f"{code_col}_navn"
-
-    # Insert the name column immediately after the code column
-    insert_at_raw = merged.columns.get_loc(code_col)
-    if not isinstance(insert_at_raw, int):
-        raise TypeError(
-            f"Expected int from get_loc, got {type(insert_at_raw)}: {insert_at_raw}"
-        )
-    insert_at = insert_at_raw
-    merged.insert(insert_at + 1, name_col_out, merged["_map_name"])
-
-    # Drop helper columns
-    merged = merged.drop(columns=["_map_code", "_map_name"])
+    # Look up each distinct code once, then spread the names back out to the rows.
+    # The trailing NaN is picked up by rows with a missing code (row code -1).
+    row_codes, uniques = (
+        factorized if factorized is not None else _factorize_codes(codes_str)
+    )
+    unique_names = np.append(np.asarray(uniques.map(lookup), dtype=object), np.nan)
+    names = pd.Series(
+        unique_names[row_codes], index=codes_str.index, name=codes_str.name
+    )
 
     # --- validation: data codes NOT present in mapping ---
-    data_codes = set(df[code_col].dropna().astype(str).str.strip())
-    map_codes = set(mapping["_map_code"])
-    invalid_in_data = sorted(data_codes - map_codes)
+    # Both sides are already unique, so only the invalid codes themselves get sorted
+    data_codes = np.asarray(uniques, dtype=object)
+    map_codes = np.fromiter(lookup, dtype=object, count=len(lookup))
+    invalid_in_data = np.sort(
+        np.setdiff1d(data_codes, map_codes, assume_unique=True)
+    ).tolist()
 
     diagnostics = {
         "code_col": code_col,
@@ -177,7 +208,7 @@ def _attach_one_mapping(
         "invalid_sample": invalid_in_data[:20],
         "all_invalid": invalid_in_data,  # keep full list in case you need it
     }
-    return merged, diagnostics
+    return names, diagnostics
 
 
 # ---------- public API ----------
@@ -224,27 +255,63 @@ def kodelister_navn(
         )
     year = int(unique_years[0])
 
-    out = df.copy()
+    if any(item.get("select_level") is None for item in mappings):
+        raise ValueError("Undefined select_level.")
+
+    # Fetch the distinct KLASS mappings concurrently; the lookups below then hit the cache.
+    fetch_keys = {(int(item["klass_id"]), item["select_level"]) for item in mappings}
+    if len(fetch_keys) > 1:
+        with ThreadPoolExecutor(max_workers=min(8, len(fetch_keys))) as pool:
+            futures = [
+                pool.submit(
+                    _fetch_mapping_for_year,
+                    klass_id=klass_id,
+                    year=year,
+                    language=language,
+                    include_future=include_future,
+                    select_level=select_level,
+                )
+                for klass_id, select_level in fetch_keys
+            ]
+            for future in futures:
+                future.result()
+
+    # Compute every name column first, then assemble the output frame once.
+    # Names for the same code column are kept newest-first, matching repeated inserts.
+    codes_by_col: dict[str, pd.Series] = {}
+    factorized_by_col: dict[str, tuple[np.ndarray, pd.Index]] = {}
+    names_after: dict[str, list[tuple[str, pd.Series]]] = {}
+    name_cols_out: set[str] = set()
     diagnostics: dict[str, Any] = {}
 
     for item in mappings:
         code_col = item["code_col"]
         klass_id = item["klass_id"]
         name_col_out = item.get("name_col_out")
-        select_level = item.get("select_level")
-        if select_level is None:
-            raise ValueError("Undefined select_level.")
-
-        out, diag = _attach_one_mapping(
-            out,
+        if name_col_out is None:
+            name_col_out = f"{code_col}_navn"
+        select_level = item["select_level"]
+
+        if code_col not in df.columns:
+            raise ValueError(f"Column '{code_col}' not found in DataFrame.")
+        if name_col_out in df.columns or name_col_out in name_cols_out:
+            raise ValueError(f"cannot insert {name_col_out}, already exists")
+        name_cols_out.add(name_col_out)
+
+        if code_col not in codes_by_col:
+            codes_by_col[code_col] = _normalise_codes(df[code_col])
+            factorized_by_col[code_col] = _factorize_codes(codes_by_col[code_col])
+        names, diag = _map_codes(
+            codes_by_col[code_col],
+            factorized=factorized_by_col[code_col],
             year=year,
             code_col=code_col,
             klass_id=klass_id,
-            name_col_out=name_col_out,
             language=language,
             include_future=include_future,
             select_level=select_level,
         )
+        names_after.setdefault(code_col, []).insert(0, (name_col_out, names))
 
         key = code_col if code_col not in diagnostics else f"{code_col}|{klass_id}"
         diagnostics[key] = diag
@@ -264,4 +331,18 @@ def kodelister_navn(
                 msg += f" | sample: {sample}{extra}"
             print(msg)
 
+    if not names_after:
+        return df, diagnostics
+
+    out_names: list[str] = []
+    out_cols: list[pd.Series] = []
+    for col in df.columns:
+        out_names.append(col)
+        out_cols.append(codes_by_col.get(col, df[col]))
+        for name_col_out, names in names_after.get(col, []):
+            out_names.append(name_col_out)
+            out_cols.append(names)
+    # Fresh RangeIndex, like the left merge this used to be built with
+    out = pd.concat(out_cols, axis=1).set_axis(out_names, axis=1).reset_index(drop=True)
+
     return out, diagnostics
@@ -12,22 +12,95 @@
 # ---
 
 # %%
+import functools
 import logging
-import re
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
-from typing import cast
 
 import ipywidgets as widgets
+import numpy as np
 import pandas as pd
 from IPython.display import display  # for nice tables in notebooks
 from klass import KlassClassification
+from pandas.api.types import is_string_dtype
 
+from ssb_kostra_python.hjelpefunksjoner import STRING_DTYPE
 from ssb_kostra_python.hjelpefunksjoner import definere_klassifikasjonsvariable
 
 logger = logging.getLogger(__name__)
 
 SEPARATOR = "-" * 230  # or whatever length you need
 
+# Missing in one regex: empty/whitespace, an NA token, or an NA token/nothing after
+# leading zeros ('0nan', '000'). Inline (?i) keeps it runnable by Arrow's regex kernel.
+# NA-tokens som teller som manglende når de står alene eller etter ledende nuller
+_NA_TOKENS = frozenset({"nan", "<na>", "none", "nul", "null", "na", "n/a", ""})
+_MISSING_PATTERN = r"(?i)\s*0*(?:nan|<na>|none|nul|null|na|n/a)?\s*"
+# Same, but for columns where all-zero codes ('000') are valid: zeros only count
+# as padding in front of an NA token, so the column is still scanned just once.
+_MISSING_ZEROS_VALID_PATTERN = r"(?i)\s*(?:0*(?:nan|<na>|none|nul|null|na|n/a))?\s*"
+
+# Format checks for periode and region codes, all matched against the unstripped value
+_BLANK_PATTERN = r"\s*"
+_PADDED_MISSING_PATTERN = r"(?i)\s*0*(?:nan|<na>|none|nul|null|na)?\s*"
+_FOUR_DIGITS_PATTERN = r"\s*\d{4}\s*"
+_NOT_FOUR_DIGITS_PATTERN = r"\s*(?:\d{1,3}|\d{5,})\s*"
+_DIGITS_PATTERN = r"\s*\d+\s*"
+# 030101-039999
+_BYDEL_PATTERN = r"\s*03(?:0(?:10[1-9]|1[1-9]\d|[2-9]\d\d)|[1-9]\d{3})\s*"
+
+
+# %%
+def _som_kategorier(df: pd.DataFrame, kolonner: list[str]) -> pd.DataFrame:
+    """Gjør klassifikasjonsvariablene om til tekstkategorier én gang før sjekkene.
+
+    Klassifikasjonsvariabler har gjerne få unike koder som gjentas mange ganger.
+    ``.str``-operasjoner på kategorier kjøres bare på de unike kodene og spres ut på
+    radene, så hver sjekk blir O(antall koder) i stedet for O(antall rader).
+    Sjekkene får dermed kolonnene ferdig som tekst og trenger ikke konvertere selv.
+    Kategoriene lagres som Arrow-tekst (``STRING_DTYPE``), så ``.str`` bruker Arrows
+    kjerner også når inndata har ``object``-kolonner.
+    """
+    return df.assign(
+        **{
+            c: _tekstkategorier(df[c])
+            for c in kolonner
+            if c in df.columns
+            and not (
+                isinstance(df[c].dtype, pd.CategoricalDtype)
+                and isinstance(df[c].cat.categories.dtype, pd.StringDtype)
+            )
+        }
+    )
+
+
+def _tekstkategorier(s: pd.Series) -> pd.Series:
+    """Kolonnen som kategorier med tekstkategorier.
+
+    Kolonner som ikke er tekst (f.eks. heltallskoder) kategoriseres før de gjøres
+    om til tekst, så bare de unike kodene konverteres, ikke hver rad.
+    """
+    if is_string_dtype(s.dtype) and not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.astype(STRING_DTYPE).astype("category")
+    kategorier = s if isinstance(s.dtype, pd.CategoricalDtype) else s.astype("category")
+    tekst = kategorier.cat.categories.astype(STRING_DTYPE)
+    if not tekst.is_unique:
+        # ulike verdier med samme tekst (f.eks. 1 og "1" i en object-kolonne)
+        return s.astype(STRING_DTYPE).astype("category")
+    return kategorier.cat.rename_categories(tekst)
+
+
+def _som_tekst(s: pd.Series) -> pd.Series:
+    """Gir kolonnen som tekst, men beholder kategorier (med kategoriene som tekst)."""
+    if isinstance(s.dtype, pd.StringDtype):
+        return s  # allerede tekst ("str" eller "string"), ingen ny kopi
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.astype(STRING_DTYPE)
+    if isinstance(s.cat.categories.dtype, pd.StringDtype):
+        return s
+    return s.cat.rename_categories(s.cat.categories.astype(STRING_DTYPE))
+
 
 # %%
 # def show_toggle(df, mask, title, *, preview_rows: int = 15):
@@ -51,6 +124,11 @@ def show_toggle(
         # Nothing to show — just the header
         display(header)
         return
+    # Radene som skal vises hentes ut én gang her, i stedet for å kopiere alle
+    # treffene med df.loc[mask] først. Knappen holder bare på dette lille utdraget,
+    # ikke på df og mask, så hele datasettet holdes ikke i live av hver widget.
+    preview_idx = np.flatnonzero(mask.to_numpy(dtype=bool, na_value=False))
+    preview = df.iloc[preview_idx[:preview_rows]].copy()
 
     btn = widgets.ToggleButton(description="Show/hide rows", icon="table", value=False)
     out = widgets.Output()
@@ -60,7 +138,7 @@ def show_toggle(
             out.clear_output()
             if btn.value:
                 with out:
-                    display(df.loc[mask].head(preview_rows))
+                    display(preview)
 
     btn.observe(_on_toggle, names="value")
     display(widgets.VBox([header, btn, out]))
@@ -81,6 +159,37 @@ def _missing_cols(inputfil: pd.DataFrame, klassifikasjonsvariable: list[str]) ->
 
 
 # %%
+def _per_kolonne(fn: Callable[[str], Any], kolonner: list[str]) -> list[Any]:
+    """Kjører ``fn`` for hver kolonne og returnerer resultatene i samme rekkefølge.
+
+    Med flere kolonner brukes en trådpool; pandas' strengkjerner slipper GIL-en, så
+    kolonnene sjekkes samtidig. ``fn`` skal bare lese fra datasettet.
+    """
+    if len(kolonner) <= 1:
+        return [fn(c) for c in kolonner]
+    with ThreadPoolExecutor(max_workers=min(8, len(kolonner))) as pool:
+        return list(pool.map(fn, kolonner))
+
+
+def _missing_mask(df: pd.DataFrame, col: str, zeros_valid_for: set[str]) -> np.ndarray:
+    """Masken for manglende verdier i én kolonne; se ``_missing_values``.
+
+    Masken er en ren bool-array; en Series lages bare for kolonner som har funn.
+    """
+    s = _som_tekst(df[col])
+
+    # native NA (na=True), empty/whitespace, NA tokens and padded-missing in one pass.
+    # If this column allows zero codes, all-zero strings are not flagged as missing.
+    pattern = (
+        _MISSING_ZEROS_VALID_PATTERN if col in zeros_valid_for else _MISSING_PATTERN
+    )
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # bare kategoriene sjekkes; kode -1 (NA) havner på det siste elementet
+        kategorier = pd.Series(s.cat.categories).str.fullmatch(pattern, na=True)
+        return np.append(kategorier.to_numpy(dtype=bool), True)[s.cat.codes.to_numpy()]
+    return s.str.fullmatch(pattern, na=True).to_numpy(dtype=bool, na_value=True)
+
+
 def _missing_values(
     df: pd.DataFrame,
     klassifikasjonsvariable: list[str],
@@ -111,8 +220,6 @@ def _missing_values(
     """
     logger.info("ℹ️ Checking for missing values in klassifikasjonsvariable...\n")
 
-    TOKENS = {"nan", "<na>", "none", "nul", "null", "na", "n/a", ""}
-
     zeros_valid_for = set(zeros_valid_for or [])
 
     missing_cols = [c for c in klassifikasjonsvariable if c not in df.columns]
@@ -123,42 +230,21 @@ def _missing_values(
 
     any_issues = False
 
-    for col in (c for c in klassifikasjonsvariable if c in df.columns):
-        s = df[col].astype("string")
-
-        # native NA
-        mask_native = s.isna()
-
-        # normalized strings
-        s_norm = s.fillna("").str.strip()
-
-        # empty/whitespace
-        mask_empty = s_norm.eq("")
-
-        # detect all-zero strings like '0', '00', '000', ...
-        mask_all_zeros = s_norm.str.fullmatch(r"0+")  # True for ONLY zeros
-
-        # padded-missing heuristic: strip leading zeros then compare to NA tokens
-        core = s_norm.str.lstrip("0").str.lower()
-        mask_token_base = core.isin(TOKENS)
-
-        # If this column allows zero codes, don't flag all-zero strings as missing
-        if col in zeros_valid_for:
-            mask_token = mask_token_base & ~mask_all_zeros
-        else:
-            mask_token = mask_token_base
-
-        # combined missing mask
-        mask_missing = mask_native | mask_empty | mask_token
+    # Maskene regnes ut parallelt; logging og visning skjer i hovedtråden, i kolonnerekkefølge
+    cols = [c for c in klassifikasjonsvariable if c in df.columns]
+    masks = _per_kolonne(
+        functools.partial(_missing_mask, df, zeros_valid_for=zeros_valid_for), cols
+    )
 
-        if mask_missing.any():
+    for col, mask_missing in zip(cols, masks, strict=True):
+        count = int(np.count_nonzero(mask_missing))
+        if count:
             any_issues = True
-            count = int(mask_missing.sum())
             logger.error(f"❌ Missing values detected in '{col}' ({count} rows).\n")
             # display(df.loc[mask_missing].head(preview_rows))
             show_toggle(
                 df,
-                mask_missing,
+                pd.Series(mask_missing, index=df.index),
                 f"Missing values in '{col}' — click to preview",
                 preview_rows=preview_rows,
             )
@@ -170,139 +256,121 @@ def _missing_values(
 
 
 # %%
-def _valid_periode_region(df: pd.DataFrame, klassifikasjonsvariable: list[str]) -> None:
-    """Denne funksjonen sjekker om verdiene (kodene) til periode- og regionsvariabelen er på riktig format. Inngår i valideringen."""
-    logger.info("ℹ️ Checking if periode and region are in the valid format...\n")
+# Feilmelding når en periode- eller regionskode har feil format
+_FORMAT_ERRORS = {
+    "periode": "❌ Check: periode is not four digits.\n",
+    "kommuneregion": "❌ Check: kommuneregion is not four digits.\n",
+    "fylkesregion": "❌ Check: fylkesregion is not four digits.\n",
+    "bydelsregion": "❌ Column 'bydelsregion' must be 6-digit numeric in 030101-039999.\n",
+}
 
-    PADDED_TOKENS = {"nan", "<na>", "none", "nul", "null", "na", ""}
 
-    for col in klassifikasjonsvariable:
-        # ----- PERIODE: must be 4 digits -----
-        if col == "periode":
-            s = df[col].astype("string")
-            mask_missing = s.isna() | s.str.strip().eq("")
-            s_norm = s.fillna("").str.strip()
-            core = s_norm.str.lstrip("0").str.lower()
-            mask_padded_missing = ~mask_missing & core.isin(PADDED_TOKENS)
-
-            # only true-format errors (exclude missing + padded-missing)
-            mask_fmt_bad = (
-                ~mask_missing & ~mask_padded_missing & ~s_norm.str.fullmatch(r"\d{4}")
-            )
+# Klassene i _periode_region_klasser; første treff vinner
+_OK, _MISSING, _PADDED_MISSING, _FMT_BAD = range(4)
 
-            if mask_padded_missing.any():
-                logger.warning(
-                    f"⚠️ Suspected zero-padded missing in '{col}'. Defer to missing-values check.\n"
-                )
-                # display(df.loc[mask_padded_missing].head(preview_rows))
-                show_toggle(
-                    df,
-                    mask_padded_missing,
-                    "Padded-missing 'periode' — click to preview",
-                    preview_rows=15,
-                )
 
-            if mask_fmt_bad.any():
-                logger.error(f"❌ Check: {col} is not four digits.\n")
-                # display(df.loc[mask_fmt_bad].head(preview_rows))
-                show_toggle(
-                    df,
-                    mask_fmt_bad,
-                    "Format-invalid 'periode' — click to preview",
-                    preview_rows=15,
-                )
-            elif not mask_padded_missing.any():
-                logger.info("✅ 'periode' is formatted correctly.\n")
+def _periode_region_klasser(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Klassifiserer hver rad i én kolonne som ok, manglende, null-utfylt manglende eller formatfeil.
 
-        # ----- KOMMUNE/FYLKESREGION: digits-only must be exactly 4; non-digits allowed -----
-        if col in ["kommuneregion", "fylkesregion"]:
-            s = df[col].astype("string")
-            mask_missing = s.isna() | s.str.strip().eq("")
-            s_norm = s.fillna("").str.strip()
-            core = s_norm.str.lstrip("0").str.lower()
-            mask_padded_missing = ~mask_missing & core.isin(PADDED_TOKENS)
-
-            mask_numeric = (
-                ~mask_missing & ~mask_padded_missing & s_norm.str.fullmatch(r"\d+")
-            )
-            mask_fmt_bad = mask_numeric & (s_norm.str.len() != 4)
+    Svaret er én int8-array per kolonne i stedet for flere boolske masker. For
+    kategoriske kolonner klassifiseres bare kategoriene, og radene slår opp i dem.
+    """
+    s = _som_tekst(df[col])
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        klasser = _klassifiser_koder(pd.Series(s.cat.categories), col)
+        # kode -1 (NA) havner på det siste elementet, som er "manglende"
+        return np.append(klasser, np.int8(_MISSING))[s.cat.codes.to_numpy()]
+    return _klassifiser_koder(s, col)
 
-            if mask_padded_missing.any():
-                logger.warning(
-                    f"⚠️ Suspected zero-padded missing in '{col}'. Defer to missing-values check.\n"
-                )
-                # display(df.loc[mask_padded_missing].head(preview_rows))
-                show_toggle(
-                    df,
-                    mask_padded_missing,
-                    f"Padded-missing '{col}' — click to preview",
-                    preview_rows=15,
-                )
 
-            if mask_fmt_bad.any():
-                logger.error(f"❌ Check: {col} is not four digits.\n")
-                # display(df.loc[mask_fmt_bad].head(preview_rows))
-                show_toggle(
-                    df,
-                    mask_fmt_bad,
-                    f"Format-invalid '{col}' — click to preview",
-                    preview_rows=15,
-                )
-            elif not mask_padded_missing.any():
-                if col == "kommuneregion":
-                    logger.info("✅ 'kommuneregion' is formatted correctly.\n")
-                else:
-                    logger.info("✅ 'fylkesregion' is formatted correctly.\n")
+def _klassifiser_koder(s: pd.Series, col: str) -> np.ndarray:
+    """Klassene for hver verdi i en tekstkolonne; se ``_periode_region_klasser``."""
+
+    def fullmatch(pattern: str, na: bool = False) -> np.ndarray:
+        return s.str.fullmatch(pattern, na=na).to_numpy(dtype=bool, na_value=na)
 
+    if col == "periode":
+        # ----- PERIODE: must be 4 digits -----
+        fmt_bad = ~fullmatch(_FOUR_DIGITS_PATTERN)
+    elif col == "bydelsregion":
         # ----- BYDELSREGION: digits-only must be 6 and in 030101-039999 -----
-        if col == "bydelsregion":
-            s = df[col].astype("string")
-            mask_missing = s.isna() | s.str.strip().eq("")
-            s_norm = s.fillna("").str.strip()
-            core = s_norm.str.lstrip("0").str.lower()
-            mask_padded_missing = ~mask_missing & core.isin(PADDED_TOKENS)
-
-            mask_numeric = (
-                ~mask_missing & ~mask_padded_missing & s_norm.str.fullmatch(r"\d+")
+        # the range is part of the regex, so no numeric conversion is needed
+        fmt_bad = fullmatch(_DIGITS_PATTERN) & ~fullmatch(_BYDEL_PATTERN)
+    else:
+        # ----- KOMMUNE/FYLKESREGION: digits-only must be exactly 4; non-digits allowed -----
+        fmt_bad = fullmatch(_NOT_FOUR_DIGITS_PATTERN)
+    # only true-format errors count as such (missing and padded-missing come first)
+    return np.select(
+        [
+            fullmatch(_BLANK_PATTERN, na=True),
+            fullmatch(_PADDED_MISSING_PATTERN),
+            fmt_bad,
+        ],
+        [_MISSING, _PADDED_MISSING, _FMT_BAD],
+        _OK,
+    ).astype(np.int8)
+
+
+def _valid_periode_region(
+    df: pd.DataFrame, klassifikasjonsvariable: list[str], preview_rows: int = 15
+) -> None:
+    """Denne funksjonen sjekker om verdiene (kodene) til periode- og regionsvariabelen er på riktig format. Inngår i valideringen."""
+    logger.info("ℹ️ Checking if periode and region are in the valid format...\n")
+
+    # Klassene regnes ut parallelt; logging og visning skjer i hovedtråden, i kolonnerekkefølge
+    cols = [c for c in klassifikasjonsvariable if c in _FORMAT_ERRORS]
+    alle_klasser = _per_kolonne(functools.partial(_periode_region_klasser, df), cols)
+
+    for col, klasser in zip(cols, alle_klasser, strict=True):
+        antall = np.bincount(klasser, minlength=4)
+        if antall[_PADDED_MISSING]:
+            logger.warning(
+                f"⚠️ Suspected zero-padded missing in '{col}'. Defer to missing-values check.\n"
             )
-            # valid if 6 digits and integer between 30101 and 39999 (leading 0 kept in string)
-            numeric_vals = pd.to_numeric(s_norm.where(mask_numeric), errors="coerce")
-            mask_range_ok = (
-                mask_numeric
-                & (s_norm.str.len() == 6)
-                & numeric_vals.between(30101, 39999)
+            # display(df.loc[mask_padded_missing].head(preview_rows))
+            show_toggle(
+                df,
+                pd.Series(klasser == _PADDED_MISSING, index=df.index),
+                f"Padded-missing '{col}' — click to preview",
+                preview_rows=preview_rows,
             )
 
-            mask_fmt_bad = mask_numeric & ~mask_range_ok
+        if antall[_FMT_BAD]:
+            logger.error(_FORMAT_ERRORS[col])
+            # display(df.loc[mask_fmt_bad].head(preview_rows))
+            show_toggle(
+                df,
+                pd.Series(klasser == _FMT_BAD, index=df.index),
+                f"Format-invalid '{col}' — click to preview",
+                preview_rows=preview_rows,
+            )
+        elif not antall[_PADDED_MISSING]:
+            logger.info(f"✅ '{col}' is formatted correctly.\n")
 
-            if mask_padded_missing.any():
-                logger.warning(
-                    f"⚠️ Suspected zero-padded missing in '{col}'. Defer to missing-values check.\n"
-                )
-                # display(df.loc[mask_padded_missing].head(preview_rows))
-                show_toggle(
-                    df,
-                    mask_padded_missing,
-                    "Padded-missing 'bydelsregion' — click to preview",
-                    preview_rows=15,
-                )
 
-            if mask_fmt_bad.any():
-                logger.error(
-                    f"❌ Column '{col}' must be 6-digit numeric in 030101-039999.\n"
-                )
-                # display(df.loc[mask_fmt_bad].head(preview_rows))
-                show_toggle(
-                    df,
-                    mask_fmt_bad,
-                    "Format-invalid 'bydelsregion' — click to preview",
-                    preview_rows=15,
-                )
-            elif not mask_padded_missing.any():
-                logger.info("✅ 'bydelsregion' is formatted correctly.\n")
+# %%
+def _klassifiser_perioder(
+    s: pd.Series,
+) -> tuple[pd.Series, pd.Series, pd.Series, pd.Series, pd.Series]:
+    """Klassifiserer de unike periodeverdiene i en tekstkolonne.
+
+    Returnerer de unike verdiene, de samme verdiene strippet, og maskene for
+    manglende, null-utfylte manglende og gyldige (firesifrede) perioder.
+    Klassifiseringen gjøres vektorisert på de unike verdiene, ikke per rad.
+    """
+    uniq = pd.Series(np.asarray(s.unique(), dtype=object), dtype=STRING_DTYPE)
+    uniq_norm = uniq.fillna("").str.strip()
+    mask_true_missing = uniq.isna() | uniq_norm.eq("")
+    core = uniq_norm.str.lstrip("0").str.lower()
+    mask_padded = ~mask_true_missing & core.isin(_NA_TOKENS)
+    mask_valid = (
+        ~mask_true_missing
+        & ~mask_padded
+        & uniq_norm.str.fullmatch(_FOUR_DIGITS_PATTERN)
+    )
+    return uniq, uniq_norm, mask_true_missing, mask_padded, mask_valid
 
 
-# %%
 def _number_of_periods_in_df(
     inputfil: pd.DataFrame, preview_rows: int = 10
 ) -> list[str]:
@@ -313,32 +381,15 @@ def _number_of_periods_in_df(
     """
     logger.info("ℹ️ Inspecting distinct 'periode' values...\n")
 
-    TOKENS = {"nan", "<na>", "none", "nul", "null", "na", "n/a", ""}
-
-    s = inputfil["periode"].astype("string")
-    uniq = list(s.unique())
+    s = _som_tekst(inputfil["periode"])
+    uniq, uniq_norm, mask_true_missing, mask_padded_uniq, mask_valid_uniq = (
+        _klassifiser_perioder(s)
+    )
+    mask_fmt_uniq = ~(mask_true_missing | mask_padded_uniq | mask_valid_uniq)
 
-    valid: list[str] = []
-    padded_missing: list[Any] = []
-    true_missing: list[Any] = []
-    fmt_invalid: list[Any] = []
-
-    for v in uniq:
-        if pd.isna(v):
-            true_missing.append(v)
-            continue
-        sv = str(v).strip()
-        if sv == "":
-            true_missing.append(v)
-            continue
-        core = sv.lstrip("0").lower()
-        if core in TOKENS:
-            padded_missing.append(v)
-            continue
-        if re.fullmatch(r"\d{4}", sv):
-            valid.append(sv)
-        else:
-            fmt_invalid.append(v)
+    valid: list[str] = uniq_norm[mask_valid_uniq].tolist()
+    padded_missing: list[Any] = uniq[mask_padded_uniq].tolist()
+    fmt_invalid: list[Any] = uniq[mask_fmt_uniq].tolist()
 
     logger.info(f"ℹ️ Found {len(uniq)} distinct 'periode' value(s).\n")
     if valid:
@@ -346,7 +397,7 @@ def _number_of_periods_in_df(
 
     # Build masks (without mutating df)
     mask_padded = s.isin(padded_missing)
-    mask_missing = s.isna() | s.fillna("").str.strip().eq("")
+    mask_missing = s.str.fullmatch(_BLANK_PATTERN, na=True)
     mask_fmt = s.isin(fmt_invalid)
 
     # 1) Padded-missing → warn + display rows
@@ -390,11 +441,23 @@ def _number_of_periods_in_df(
     if not (mask_padded.any() or mask_missing.any() or mask_fmt.any()):
         logger.info("✅ All distinct 'periode' values look valid.\n")
 
-    print(valid)
     return valid
 
 
 # %%
+@functools.lru_cache(maxsize=256)
+def _get_klass_codes(klass_id: int, year: str) -> tuple[str, ...]:
+    """Henter kodene i en KLASS-kodeliste for et år.
+
+    Resultatet bufres bare i minnet for prosessen, så en ny kjøring (eller
+    ``_get_klass_codes.cache_clear()``) henter alltid gjeldende koder fra KLASS.
+    """
+    k = KlassClassification(str(klass_id), language="en", include_future=True)
+    result = k.get_codes(from_date=f"{year}-01-01", to_date=f"{year}-12-31")
+    df_codes: Any = getattr(result, "data", result)
+    return tuple(df_codes["code"].astype(str).str.strip())
+
+
 # assumes `show_toggle(...)` exists and `logger` is configured
 # assumes KlassClassification is available in scope
 
@@ -434,23 +497,9 @@ def _klass_check(
     antall_perioder = 0
 
     if "periode" in klassifikasjonsvariable and "periode" in df.columns:
-        s = df["periode"].astype("string")
-        uniq = pd.Series(s.unique())
-
-        TOKENS = {"nan", "<na>", "none", "nul", "null", "na", "n/a", ""}
-
-        def _is_valid_year(v: Any) -> bool:
-            if pd.isna(v):
-                return False
-            sv = str(v).strip()
-            if sv == "":
-                return False
-            core = sv.lstrip("0").lower()
-            if core in TOKENS:
-                return False
-            return bool(re.fullmatch(r"\d{4}", sv))
-
-        valid_years = sorted([str(v).strip() for v in uniq if _is_valid_year(v)])
+        s = _som_tekst(df["periode"])
+        _, uniq_norm, _, _, mask_valid = _klassifiser_perioder(s)
+        valid_years = sorted(uniq_norm[mask_valid].tolist())
         antall_perioder = len(valid_years)
         if antall_perioder == 1:
             periode = valid_years[0]
@@ -559,24 +608,6 @@ def _klass_check(
     klass_ids = {**defaults, **extra_map}
 
     # ---------- Phase C: validate each mapped column against KLASS ----------
-    # simple in-run cache to avoid refetching the same (klass_id, periode)
-    _cache: dict[tuple[int, str], list[str]] = {}
-
-    def _get_klass_codes(klass_id: int, year: str) -> list[str]:
-        key = (klass_id, year)
-        if key in _cache:
-            return _cache[key]
-        k = KlassClassification(str(klass_id), language="en", include_future=True)
-        result = k.get_codes(from_date=f"{year}-01-01", to_date=f"{year}-12-31")
-        df_codes: Any = getattr(result, "data", result)
-        codes = (
-            df_codes[["code"]]
-            .assign(code=lambda s: s["code"].astype(str).str.strip())["code"]
-            .tolist()
-        )
-        _cache[key] = codes
-        return cast(list[str], codes)
-
     for col in klassifikasjonsvariable:
         if col == "periode":
             continue
@@ -590,11 +621,16 @@ def _klass_check(
             logger.warning(f"⚠️ Column '{col}' not found in data; skipping.\n")
             continue
 
-        series = df[col].astype("string").dropna().str.strip()
-        if series.empty:
+        # Only the distinct codes are stripped and compared. factorize gives each row
+        # the position of its code (-1 for NA), so the row mask is a lookup rather
+        # than a second pass over the strings; for categorical columns it works on
+        # the integer codes and keeps only the categories in use.
+        s = _som_tekst(df[col])
+        row_codes, uniques = pd.factorize(s)
+        dataset_codes = pd.Series(np.asarray(uniques, dtype=object), dtype=STRING_DTYPE)
+        if dataset_codes.empty:
             logger.warning(f"⚠️ Column '{col}' has no non-missing values; skipping.\n")
             continue
-        dataset_codes = series.tolist()
 
         klass_id = klass_ids[col]
         try:
@@ -605,13 +641,16 @@ def _klass_check(
             )
             continue
 
-        missing = sorted(set(dataset_codes) - set(klass_codes))
+        # Series.isin on Arrow-backed strings runs as Arrow's hash-based is_in kernel
+        is_bad = ~dataset_codes.str.strip().isin(klass_codes).to_numpy(dtype=bool)
+        missing = sorted(dataset_codes[is_bad].str.strip().unique())
         if missing:
             logger.error(
                 f"❌ Column '{col}' contains codes not present in KLASS for {periode} \n"
                 f"({len(missing)} distinct code(s))."
             )
-            mask_invalid = df[col].astype("string").str.strip().isin(missing)
+            # row code -1 (NA) picks the appended False
+            mask_invalid = pd.Series(np.append(is_bad, False)[row_codes], index=s.index)
             show_toggle(
                 df,
                 mask_invalid,
@@ -641,6 +680,8 @@ def validering(
     else:
         logger.info("Klassifikasjonsvariable allerede definert.")
     _missing_cols(inputfil, klassifikasjonsvariable)
+    # Kastes til kategorier én gang, så sjekkene under bare jobber på de unike kodene
+    inputfil = _som_kategorier(inputfil, klassifikasjonsvariable)
     print("\n" + SEPARATOR)
     # _missing_values(inputfil, klassifikasjonsvariable)
     _missing_values(
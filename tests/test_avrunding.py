@@ -3,8 +3,11 @@ from typing import Any
 
 import numpy as np
 import pandas as pd
+import pytest
 
+from ssb_kostra_python import avrunding
 from ssb_kostra_python.avrunding import _round_half_up
+from ssb_kostra_python.avrunding import _round_half_up_int64
 from ssb_kostra_python.avrunding import konverter_dtypes
 
 
@@ -28,6 +31,43 @@ class TestRoundingAndKonverterDtypes:
         assert np.allclose(out1, [1.3, 1.4, -1.3, -1.4])
         assert np.allclose(out2, [1.25, 1.35, -1.25, -1.35])
 
+    def test_round_half_up_keeps_index_and_missing_values(self) -> None:
+        """Verify that index, name and missing values survive the rounding."""
+        s = pd.Series(
+            pd.array([5, None, -5], dtype="Int64"), index=[10, 20, 30], name="v"
+        )
+        out = _round_half_up(s / 10, decimals=0)
+
+        assert out.index.tolist() == [10, 20, 30]
+        assert out.name == "v"
+        assert np.allclose(out, [1, np.nan, -1], equal_nan=True)
+
+    @pytest.mark.parametrize("decimals", [0, 1, 2])
+    def test_round_half_up_numexpr_matches_numpy(
+        self, mocker: Any, decimals: int
+    ) -> None:
+        """Verify that the numexpr path for large inputs rounds like the numpy path."""
+        pytest.importorskip("numexpr")
+        s = pd.Series([0.5, -0.5, 1.25, -1.35, 2.345, np.nan, -2.5, 0.0])
+        expected = _round_half_up(s, decimals=decimals)
+
+        mocker.patch("ssb_kostra_python.avrunding._NUMEXPR_MIN_SIZE", 0)
+        out = _round_half_up(s, decimals=decimals)
+
+        pd.testing.assert_series_equal(out, expected)
+
+    def test_round_half_up_int64_gives_nullable_integers(self) -> None:
+        """Verify the direct Int64 rounding, including missing and too large values."""
+        df = pd.DataFrame({"a": [0.5, np.nan, -2.5], "b": ["1.4", "x", "7"]})
+
+        out = _round_half_up_int64(df)
+
+        assert (out.dtypes == "Int64").all()
+        assert out["a"].tolist() == [1, pd.NA, -3]
+        assert out["b"].tolist() == [1, pd.NA, 7]
+        with pytest.raises((TypeError, ValueError)), np.errstate(invalid="ignore"):
+            _round_half_up_int64(pd.DataFrame({"a": [1e20]}))
+
     def test_konverter_dtypes_converts_groups_correctly(self, mocker: Any) -> None:
         """Verify that konverter_dtypes applies each conversion group correctly."""
         mocker.patch("ssb_kostra_python.avrunding.logger", autospec=True)
@@ -70,6 +110,52 @@ class TestRoundingAndKonverterDtypes:
         assert out["keep"].tolist() == ["x", "y", "z", "w"]
         assert dtypes.equals(out.dtypes)
 
+    def test_konverter_dtypes_converts_several_columns_per_group(
+        self, mocker: Any
+    ) -> None:
+        """Verify that every column in a group gets its own converted dtype."""
+        mocker.patch("ssb_kostra_python.avrunding.logger", autospec=True)
+        mocker.patch("ssb_kostra_python.avrunding.display", autospec=True)
+        df = pd.DataFrame(
+            {
+                "a": [0.5, -1.5],
+                "b": pd.array([3, None], dtype="Int64"),
+                "c": ["2.5", "x"],
+            }
+        )
+
+        out, _ = konverter_dtypes(df, {"heltall": ["a", "b", "c", "a"]})
+
+        assert (out.dtypes == "Int64").all()
+        assert out["a"].tolist() == [1, -2]
+        assert out["b"].tolist() == [3, pd.NA]
+        assert out["c"].tolist() == [3, pd.NA]
+
+    def test_konverter_dtypes_skips_columns_with_target_dtype(
+        self, mocker: Any
+    ) -> None:
+        """Verify that integer and already-converted columns are not rounded again."""
+        mocker.patch("ssb_kostra_python.avrunding.logger", autospec=True)
+        mocker.patch("ssb_kostra_python.avrunding.display", autospec=True)
+        spy = mocker.spy(avrunding, "_round_half_up")
+        df = pd.DataFrame(
+            {
+                "n": pd.array([1, None], dtype="Int64"),
+                "i": [1, 2],
+                "k": pd.Categorical(["a", "b"]),
+            }
+        )
+
+        out, _ = konverter_dtypes(
+            df, {"heltall": ["n", "i"], "klassifikasjonsvariabel": ["k"]}
+        )
+
+        spy.assert_not_called()
+        assert out["n"].tolist() == [1, pd.NA]
+        assert out["i"].tolist() == [1, 2]
+        assert str(out["i"].dtype) == "Int64"
+        pd.testing.assert_series_equal(out["k"], df["k"])
+
     def test_konverter_dtypes_warns_for_missing_and_unknown_group(
         self, mocker: Any
     ) -> None:
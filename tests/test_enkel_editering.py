@@ -1,8 +1,10 @@
 import inspect
 
+import numpy as np
 import pandas as pd
 import pytest
 
+from ssb_kostra_python import enkel_editering
 from ssb_kostra_python.enkel_editering import dataframe_cell_editor_mvp
 
 
@@ -151,9 +153,204 @@ def test_row_id_is_added_internally_but_not_returned(
     df_working = closure.nonlocals["df_working"]
     row_id_col = closure.nonlocals["ROW_ID"]
 
-    # Assert: ROW_ID exists internally
+    # Assert: ROW_ID exists internally as a plain int64 range
     assert row_id_col in df_working.columns
+    assert df_working[row_id_col].dtype == "int64"
+    assert df_working[row_id_col].tolist() == list(range(len(df)))
 
     # Assert: ROW_ID does not appear in exported results
     df_edited, _ = get_results()
     assert row_id_col not in df_edited.columns
+
+
+def test_classification_is_asked_for_each_editor(mocker: Any, df: pd.DataFrame) -> None:
+    """Each editor asks for its own classification; no answer is remembered."""
+    mock_define = mocker.patch(
+        "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+        autospec=True,
+    )
+    mock_define.return_value = (["periode", "kommuneregion"], ["utgifter"])
+    mocker.patch("ssb_kostra_python.enkel_editering.display", autospec=True)
+    mocker.patch("ssb_kostra_python.enkel_editering.clear_output", autospec=True)
+
+    dataframe_cell_editor_mvp(df)
+    dataframe_cell_editor_mvp(df)
+
+    assert mock_define.call_count == 2
+
+
+def _widgets_by_description(ui: Any) -> dict[str, Any]:
+    """Collect the widgets in the editor UI, keyed by their description."""
+    found: dict[str, Any] = {}
+    stack = [ui]
+    while stack:
+        w = stack.pop()
+        stack.extend(getattr(w, "children", ()))
+        if getattr(w, "description", ""):
+            found[w.description] = w
+    return found
+
+
+def test_commit_edit_updates_row_and_logs_change(mocker: Any, df: pd.DataFrame) -> None:
+    """Drive the widgets to commit one edit and check the exported results."""
+    mock_define = mocker.patch(
+        "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+        autospec=True,
+    )
+    mock_define.return_value = (
+        ["periode", "kommuneregion"],
+        ["utgifter", "flag", "tekst"],
+    )
+    mock_display = mocker.patch(
+        "ssb_kostra_python.enkel_editering.display", autospec=True
+    )
+    mocker.patch("ssb_kostra_python.enkel_editering.clear_output", autospec=True)
+    df = df.set_axis([10, 20])
+    original = df.copy()
+
+    get_results = dataframe_cell_editor_mvp(df)
+    w = _widgets_by_description(mock_display.call_args_list[-1].args[0])
+
+    w["Apply filter"].click()
+    w["Edit column:"].value = "utgifter"
+    w["New value:"].value = "42"
+    w["Row IDs:"].value = (1,)
+    w["Reason:"].value = "korrigering"
+    w["Commit edit"].click()
+
+    df_edited, log_df = get_results()
+    assert df_edited["utgifter"].tolist() == [10, 42]
+    assert df_edited.index.tolist() == [10, 20]
+    assert len(log_df) == 1
+    assert log_df.loc[0, "row_id"] == 1
+    assert log_df.loc[0, "old_value"] == 20
+    assert log_df.loc[0, "new_value"] == 42
+    assert log_df.loc[0, "id_periode"] == "2024K4"
+    assert log_df["timestamp"].dtype == "datetime64[s]"
+    pd.testing.assert_frame_equal(df, original)
+
+
+def test_change_log_builds_typed_frame_from_appended_entries() -> None:
+    """Verify that the column-wise log fills missing fields and types the columns."""
+    log = enkel_editering._ChangeLog()
+    assert log.to_frame().empty
+
+    log.append({"row_id": 3, "column": "utgifter", "old_value": 1, "new_value": 2})
+    log.append({"row_id": 4, "old_value": "a", "new_value": None, "id_periode": "x"})
+
+    out = log.to_frame()
+    assert len(log) == 2
+    assert list(out.columns[:7]) == list(enkel_editering._LOG_SCHEMA)
+    assert str(out["row_id"].dtype) == "Int64"
+    assert out["row_id"].tolist() == [3, 4]
+    assert out["column"].tolist() == ["utgifter", pd.NA]
+    assert out["old_value"].tolist() == [1, "a"]
+    assert out["id_periode"].tolist() == [pd.NA, "x"]
+
+
+def test_get_results_shares_data_without_seeing_later_edits(
+    mocker: Any, df: pd.DataFrame
+) -> None:
+    """Exports should not copy the data, but must stay unchanged by later edits."""
+    mock_define = mocker.patch(
+        "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+        autospec=True,
+    )
+    mock_define.return_value = (["periode", "kommuneregion"], ["utgifter"])
+    mocker.patch("ssb_kostra_python.enkel_editering.display", autospec=True)
+    mocker.patch("ssb_kostra_python.enkel_editering.clear_output", autospec=True)
+
+    get_results = dataframe_cell_editor_mvp(df)
+    df_working = inspect.getclosurevars(get_results).nonlocals["df_working"]
+
+    first, _ = get_results()
+    assert np.shares_memory(
+        first["utgifter"].array._data, df_working["utgifter"].array._data
+    )
+    assert np.shares_memory(
+        df["utgifter"].array._data, df_working["utgifter"].array._data
+    )
+
+    df_working.loc[0, "utgifter"] = 9999
+    second, _ = get_results()
+    assert first.loc[0, "utgifter"] == 10
+    assert second.loc[0, "utgifter"] == 9999
+    assert df.loc[0, "utgifter"] == 10
+
+
+def test_change_log_reuses_export_until_next_append() -> None:
+    """Verify that repeated exports reuse the built frame without sharing mutations."""
+    log = enkel_editering._ChangeLog()
+    log.append({"row_id": 1, "id_b": "x", "id_a": "y"})
+
+    first = log.to_frame()
+    built = log._frame
+    first.loc[0, "row_id"] = 99
+    second = log.to_frame()
+    assert log._frame is built
+    assert second.loc[0, "row_id"] == 1
+    assert list(second.columns[-2:]) == ["id_b", "id_a"]
+
+    log.append({"row_id": 2})
+    assert log.to_frame()["row_id"].tolist() == [1, 2]
+
+
+def test_commit_edit_targets_the_selected_row_with_duplicate_index(
+    mocker: Any, df: pd.DataFrame
+) -> None:
+    """Edits are placed by position, so duplicated index labels are not a problem."""
+    mock_define = mocker.patch(
+        "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+        autospec=True,
+    )
+    mock_define.return_value = (["periode", "kommuneregion"], ["utgifter"])
+    mock_display = mocker.patch(
+        "ssb_kostra_python.enkel_editering.display", autospec=True
+    )
+    mocker.patch("ssb_kostra_python.enkel_editering.clear_output", autospec=True)
+    df = df.set_axis([7, 7])
+
+    get_results = dataframe_cell_editor_mvp(df)
+    w = _widgets_by_description(mock_display.call_args_list[-1].args[0])
+    w["Apply filter"].click()
+    w["New value:"].value = "5"
+    w["Row IDs:"].value = (1,)
+    w["Reason:"].value = "korrigering"
+    w["Commit edit"].click()
+
+    df_edited, log_df = get_results()
+    assert df_edited["utgifter"].tolist() == [10, 5]
+    assert log_df["old_value"].tolist() == [20]
+    assert df["utgifter"].tolist() == [10, 20]
+
+
+def test_commit_edit_requires_an_editable_column(mocker: Any, df: pd.DataFrame) -> None:
+    """Without any statistical variables there is no column to edit."""
+    mock_define = mocker.patch(
+        "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+        autospec=True,
+    )
+    mock_define.return_value = (["periode", "kommuneregion"], [])
+    mock_display = mocker.patch(
+        "ssb_kostra_python.enkel_editering.display", autospec=True
+    )
+    mocker.patch("ssb_kostra_python.enkel_editering.clear_output", autospec=True)
+
+    get_results = dataframe_cell_editor_mvp(df)
+    ui = mock_display.call_args_list[-1].args[0]
+    w = _widgets_by_description(ui)
+    w["Apply filter"].click()
+    w["New value:"].value = "5"
+    w["Row IDs:"].value = (0,)
+    w["Reason:"].value = "korrigering"
+    w["Commit edit"].click()
+
+    messages = []
+    stack = [ui]
+    while stack:
+        widget = stack.pop()
+        stack.extend(getattr(widget, "children", ()))
+        messages.append(str(getattr(widget, "value", "")))
+    assert any("Choose a column to edit." in m for m in messages)
+    _, log_df = get_results()
+    assert log_df.empty
@@ -2,10 +2,16 @@ from typing import Any
 
 import numpy as np
 import pandas as pd
+import pandas._testing as tm
+import pytest
 
+from ssb_kostra_python.hjelpefunksjoner import STRING_DTYPE
+from ssb_kostra_python.hjelpefunksjoner import _pad_digits
 from ssb_kostra_python.hjelpefunksjoner import definere_klassifikasjonsvariable
 from ssb_kostra_python.hjelpefunksjoner import format_fil
 from ssb_kostra_python.hjelpefunksjoner import konvertere_komma_til_punktdesimal
+from ssb_kostra_python.hjelpefunksjoner import nedkaste_for_summering
+from ssb_kostra_python.hjelpefunksjoner import summere_grupper
 
 
 class TestFormatFil:
@@ -21,7 +27,12 @@ class TestFormatFil:
             }
         )
 
-        out = format_fil(df.copy())
+        df_before = df.copy(deep=True)
+
+        out = format_fil(df)
+
+        # Assert: the input is left untouched
+        pd.testing.assert_frame_equal(df, df_before)
 
         # Assert: fixed-width formatting
         assert out["periode"].tolist() == ["0001", "0023", "2025"]
@@ -46,7 +57,7 @@ class TestFormatFil:
             }
         )
 
-        out = format_fil(df.copy())
+        out = format_fil(df)
 
         assert out["kommuneregion"].tolist() == ["0301", "0301", "12A", "12345", pd.NA]
         assert pd.api.types.is_string_dtype(out["kommuneregion"])
@@ -59,7 +70,7 @@ class TestFormatFil:
             }
         )
 
-        out = format_fil(df.copy())
+        out = format_fil(df)
 
         assert out["fylkesregion"].tolist() == ["0003", "0003", "0301", "AB", ""]
 
@@ -71,10 +82,50 @@ class TestFormatFil:
             }
         )
 
-        out = format_fil(df.copy())
+        out = format_fil(df)
 
         assert out["bydelsregion"].tolist() == ["000301", "030101", "12A", "1234567"]
 
+    def test_repeated_values_keep_their_rows_and_index(self) -> None:
+        """Padding runs per unique value but every row gets its own result back."""
+        df = pd.DataFrame(
+            {
+                "periode": ["2025", "24", "2025", None],
+                "kommuneregion": ["301", None, "301", "1103"],
+            },
+            index=[5, 3, 9, 1],
+        )
+
+        out = format_fil(df)
+
+        assert out.index.tolist() == [5, 3, 9, 1]
+        assert out["periode"].tolist() == ["2025", "0024", "2025", pd.NA]
+        assert out["kommuneregion"].tolist() == ["0301", pd.NA, "0301", "1103"]
+
+    def test_pad_digits_keeps_missing_and_non_digit_values(self) -> None:
+        """The shared padding rule leaves NA, letters and long codes alone."""
+        s = pd.Series(["7", None, "A1", "123456", "12"], dtype=STRING_DTYPE)
+
+        out = _pad_digits(s, 6)
+
+        assert out.tolist() == ["000007", pd.NA, "A1", "123456", "000012"]
+        assert out.dtype == s.dtype
+
+    def test_already_formatted_columns_are_reused(self) -> None:
+        """String columns that are already padded are not recast or copied."""
+        df = pd.DataFrame(
+            {
+                "periode": pd.array(["2025", "2025"], dtype="string"),
+                "kommuneregion": pd.array(["0301", "1103"], dtype="string"),
+                "personer": [1, 2],
+            }
+        )
+
+        out = format_fil(df)
+
+        pd.testing.assert_frame_equal(out, df)
+        assert tm.shares_memory(out["kommuneregion"], df["kommuneregion"])
+
 
 class TestDefinereKlassifikasjonsvariable:
     """Defining klassifikasjonsvariable and statistikkvariable."""
@@ -143,6 +194,24 @@ class TestDefinereKlassifikasjonsvariable:
         assert pd.api.types.is_string_dtype(df["fylkesregion"])
         assert pd.api.types.is_string_dtype(df["alder"])
 
+    def test_conversion_matches_plain_astype(self, mocker: Any) -> None:
+        """Converting per unique code gives the same column as a plain cast."""
+        df = pd.DataFrame(
+            {
+                "periode": [2025, 2024, 2025],
+                "kommuneregion": pd.Categorical(["0301", "1103", "0301"]),
+                "kjonn": [1.0, np.nan, 1.0],
+                "value": [1, 2, 3],
+            },
+            index=[7, 3, 5],
+        )
+        expected = df.astype({c: STRING_DTYPE for c in df.columns[:3]})
+        mocker.patch("builtins.input", return_value="kjonn")
+
+        definere_klassifikasjonsvariable(df)
+
+        pd.testing.assert_frame_equal(df, expected)
+
 
 class TestKonvertereKommaTilPunktdesimal:
     """Tests for `konvertere_komma_til_punktdesimal(df)`."""
@@ -151,8 +220,9 @@ class TestKonvertereKommaTilPunktdesimal:
         """Verify that comma-decimal strings are converted to floats."""
         df = pd.DataFrame({"a": ["1,5", "2,0", "3,25"]})
         out = konvertere_komma_til_punktdesimal(df)
-        assert np.allclose(out["a"].to_numpy(), [1.5, 2.0, 3.25])
-        assert pd.api.types.is_float_dtype(out["a"])
+        pd.testing.assert_series_equal(
+            out["a"], pd.Series([1.5, 2.0, 3.25], name="a"), check_exact=False
+        )
 
     def test_leaves_columns_without_commas_unchanged(self) -> None:
         """Verifying that columns that do NOT contain comma decimals are unchanged."""
@@ -172,8 +242,9 @@ class TestKonvertereKommaTilPunktdesimal:
         """Verifying the rule: if ANY value in a column contains a comma, convert the whole column."""
         df = pd.DataFrame({"a": ["1,5", "2"]})
         out = konvertere_komma_til_punktdesimal(df)
-        assert np.allclose(out["a"].to_numpy(), [1.5, 2.0])
-        assert pd.api.types.is_float_dtype(out["a"])
+        pd.testing.assert_series_equal(
+            out["a"], pd.Series([1.5, 2.0], name="a"), check_exact=False
+        )
 
     def test_does_not_modify_input_dataframe(self) -> None:
         """Verify that konvertere_komma_til_punktdesimal does NOT mutate the input DataFrame."""
@@ -183,3 +254,150 @@ class TestKonvertereKommaTilPunktdesimal:
         _ = konvertere_komma_til_punktdesimal(df)
 
         pd.testing.assert_frame_equal(df, df_before)
+
+    def test_columns_without_commas_are_not_copied(self) -> None:
+        """Only converted columns are new; the rest share data with the input."""
+        df = pd.DataFrame({"a": ["1,5", "2,0"], "b": ["x", "y"], "c": [10, 20]})
+
+        out = konvertere_komma_til_punktdesimal(df)
+
+        assert tm.shares_memory(out["b"], df["b"])
+        assert tm.shares_memory(out["c"], df["c"])
+        assert df["a"].tolist() == ["1,5", "2,0"]
+
+    def test_non_text_object_and_categorical_columns(self) -> None:
+        """Object columns of ints and numeric categoricals are checked, not converted."""
+        df = pd.DataFrame(
+            {
+                "a": ["1,5", "2,0"],
+                "heltall": pd.Series([10, 20], dtype=object),
+                "kategori": pd.Categorical([1, 2]),
+            }
+        )
+
+        out = konvertere_komma_til_punktdesimal(df)
+
+        assert out["a"].tolist() == [1.5, 2.0]
+        pd.testing.assert_series_equal(out["heltall"], df["heltall"])
+        pd.testing.assert_series_equal(out["kategori"], df["kategori"])
+
+
+class TestNedkasteForSummering:
+    """Tests for `nedkaste_for_summering(df, statistikkvariable, sum_dtype)`."""
+
+    def test_keeps_dtypes_when_not_requested_or_small(self) -> None:
+        """Verify that nothing is cast by default or for small frames."""
+        df = pd.DataFrame({"a": [1.5, 2.5]})
+
+        out, original = nedkaste_for_summering(df, ["a"], None)
+        assert out is df
+        assert original == {}
+
+        out, original = nedkaste_for_summering(df, ["a"], "float32")
+        assert out is df
+        assert original == {}
+
+    def test_casts_large_float64_frames(self, mocker: Any) -> None:
+        """Verify that float64 columns are cast and the original dtypes returned."""
+        mocker.patch(
+            "ssb_kostra_python.hjelpefunksjoner.SUMMERING_NEDKAST_MIN_RADER", 1
+        )
+        df = pd.DataFrame({"a": [1.5, 2.5], "b": [3.0, 4.0]})
+
+        out, original = nedkaste_for_summering(df, ["a", "b"], "float32")
+
+        assert original == {"a": np.dtype("float64"), "b": np.dtype("float64")}
+        assert out["a"].dtype == "float32"
+        assert out["b"].dtype == "float32"
+        assert df["a"].dtype == "float64"
+
+    def test_skips_when_not_all_float64(self, mocker: Any) -> None:
+        """Verify that integer counters are never downcast."""
+        mocker.patch(
+            "ssb_kostra_python.hjelpefunksjoner.SUMMERING_NEDKAST_MIN_RADER", 1
+        )
+        df = pd.DataFrame({"a": [1.5, 2.5], "n": [1, 2]})
+
+        out, original = nedkaste_for_summering(df, ["a", "n"], "float32")
+
+        assert original == {}
+        assert out["a"].dtype == "float64"
+
+
+class TestSummereGrupper:
+    """Tests for `summere_grupper(df, keys, statistikkvariable)`."""
+
+    def test_matches_pandas_groupby_sum(self) -> None:
+        """Group order, key dtypes, NaN handling and stat dtypes follow groupby."""
+        df = pd.DataFrame(
+            {
+                "kommuneregion": pd.array(
+                    ["0301", "1103", "0301", None, "1103"], dtype="string"
+                ),
+                "to": pd.array(["000-004"] * 5, dtype="string"),
+                "personer": np.array([1, 2, 3, 4, 5], dtype="int32"),
+                "andel": [0.5, np.nan, 0.25, 1.0, 0.5],
+            }
+        )
+        keys = ["kommuneregion", "to"]
+        stats = ["personer", "andel"]
+
+        out = summere_grupper(df, keys, stats)
+
+        expected = df.groupby(keys, as_index=False, observed=True, sort=False)[
+            stats
+        ].sum()
+        pd.testing.assert_frame_equal(out, expected)
+
+    @pytest.mark.parametrize(
+        ("dtype", "verdi"),
+        [("int8", 100), ("int16", 32767), ("int32", 2147483647), ("uint8", 200)],
+    )
+    def test_narrow_integer_overflow_matches_pandas(
+        self, dtype: str, verdi: int
+    ) -> None:
+        """Sums that do not fit the input dtype are kept wide, as in groupby."""
+        df = pd.DataFrame(
+            {
+                "to": ["000-004", "000-004", "005-009"],
+                "personer": np.array([verdi, verdi, 1], dtype=dtype),
+            }
+        )
+
+        out = summere_grupper(df, ["to"], ["personer"])
+
+        expected = df.groupby(["to"], as_index=False, observed=True, sort=False)[
+            ["personer"]
+        ].sum()
+        pd.testing.assert_frame_equal(out, expected)
+        assert out["personer"].tolist() == [2 * verdi, 1]
+
+    def test_nullable_integers_fall_back_to_pandas(self) -> None:
+        """Extension dtypes keep pandas' own NA-aware summation."""
+        df = pd.DataFrame(
+            {"to": ["000-004", "000-004"], "personer": pd.array([1, None], "Int64")}
+        )
+
+        out = summere_grupper(df, ["to"], ["personer"])
+
+        assert out["personer"].dtype == "Int64"
+        assert out["personer"].tolist() == [1]
+
+    def test_numba_engine_matches_numpy_engine(self) -> None:
+        """The compiled kernel gives the same sums as the numpy path."""
+        pytest.importorskip("numba")
+        df = pd.DataFrame(
+            {
+                "kommuneregion": ["0301", "1103", "0301", "1103"],
+                "personer": np.array([1, 2, 3, 4], dtype="int32"),
+                "andel": [0.5, np.nan, 0.25, 1.0],
+            }
+        )
+
+        out = summere_grupper(
+            df, ["kommuneregion"], ["personer", "andel"], engine="numba"
+        )
+
+        pd.testing.assert_frame_equal(
+            out, summere_grupper(df, ["kommuneregion"], ["personer", "andel"])
+        )
@@ -1,22 +1,30 @@
+import re
 from typing import Any
 
+import numpy as np
 import pandas as pd
 import pytest
 
+from ssb_kostra_python import regionshierarki as rh
 from ssb_kostra_python.regionshierarki import hierarki
 from ssb_kostra_python.regionshierarki import mapping_bydeler_oslo
 from ssb_kostra_python.regionshierarki import mapping_fra_fylkeskommune_til_kostraregion
 from ssb_kostra_python.regionshierarki import mapping_fra_kommune_til_fylkeskommune
 from ssb_kostra_python.regionshierarki import mapping_fra_kommune_til_landet
+from ssb_kostra_python.regionshierarki import overfore_data_fra_fk_til_k
 
 # =============================================================================
-# SECTION 1: mapping_bydeler_oslo (BYDELER)
+# Shared KLASS fakes and code tables
 # =============================================================================
+# The fakes carry no mutable state and the tables are never modified, so the
+# tests and sections below can run in any order or in separate processes.
 
 
-class FakeCodes_bb_eab:
+class FakeCodes:
     """Test double for the object returned by KlassClassification.get_codes(...)."""
 
+    __slots__ = ("_pivot_df",)
+
     def __init__(self, pivot_df: pd.DataFrame) -> None:
         """Initialize fake with dataframe returned by pivot_level()."""
         self._pivot_df = pivot_df
@@ -25,80 +33,113 @@ class FakeCodes_bb_eab:
         return self._pivot_df
 
 
-class FakeKlassClassification_bb_eab:
-    """Test double for KlassClassification used by mapping_bydeler_oslo."""
+def make_fake_klass(pivot_df: pd.DataFrame) -> type:
+    """Build a fake KlassClassification whose codes pivot to ``pivot_df``.
 
-    pivot_df: pd.DataFrame | None = None  # set per test
+    The data lives in the returned class itself, so nothing is shared between
+    tests and no state has to be reset afterwards.
+    """
 
-    def __init__(
-        self, klass_id: int, language: str = "nb", include_future: bool = True
-    ) -> None:
-        """Initialize fake KlassClassification with expected constructor arguments."""
-        self.klass_id = klass_id
-        self.language = language
-        self.include_future = include_future
+    class FakeKlassClassification:
+        """Test double for KlassClassification used by the mapping functions."""
 
-    from typing import Any
+        __slots__ = ()
 
-    def get_codes(self, *args: Any, **kwargs: Any) -> FakeCodes_bb_eab:
-        """Return fake codes object for testing."""
-        if self.__class__.pivot_df is None:
-            raise ValueError(
-                "pivot_df must be set to a DataFrame before calling get_codes."
-            )
-        return FakeCodes_bb_eab(self.__class__.pivot_df)
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            """Accept and ignore the KlassClassification constructor arguments."""
 
+        def get_codes(self, *args: Any, **kwargs: Any) -> FakeCodes:
+            """Return fake codes object for testing."""
+            return FakeCodes(pivot_df)
 
-class TestMappingBydelerOslo:
-    """Tests for mapping_bydeler_oslo(year)."""
+    return FakeKlassClassification
 
-    def test_mapping_bydeler_oslo_filters_and_sets_to_EAB(self, mocker: Any) -> None:
-        """Checks if the function maps and filters correctly."""
-        mocker.patch(
-            "ssb_kostra_python.regionshierarki.KlassClassification",
-            FakeKlassClassification_bb_eab,
-        )
-        FakeKlassClassification_bb_eab.pivot_df = pd.DataFrame(
+
+def _mapping_pairs(out: pd.DataFrame) -> set[tuple[str, str]]:
+    """All (from, to) pairs in a mapping, for cheap membership checks."""
+    # to_numpy() does not copy when the column already is a numpy array
+    return set(zip(out["from"].to_numpy(), out["to"].to_numpy(), strict=True))
+
+
+def _assert_codes(
+    codes: pd.Series, length: int | None = None, suffix: str | None = None
+) -> None:
+    """Assert that every code has ``length`` characters and/or ends with ``suffix``."""
+    if length is not None:
+        assert codes.str.len().eq(length).all()
+    if suffix is not None:
+        assert codes.str.endswith(suffix).all()
+
+
+@pytest.fixture(scope="session")
+def pivots() -> dict[str, pd.DataFrame]:
+    """KLASS code tables (``pivot_level()`` output) shared by the mapping tests.
+
+    Built once per session; the mapping functions only filter and copy them.
+    pandas 3 already stores these string columns in pyarrow-backed ``str``.
+    """
+    return {
+        "bydeler": pd.DataFrame(
             {
                 "code_1": ["030101", "030116", "030117", "030102", "EAB", "030103"],
-                "name_1": [
-                    "A",
-                    "B",
-                    "C",
-                    "D",
-                    "Samlebydel",
-                    "E",
-                ],
+                "name_1": ["A", "B", "C", "D", "Samlebydel", "E"],
             }
-        )
+        ),
+        "bydeler_bare_filtrerte": pd.DataFrame({"code_1": ["030116", "030117", "EAB"]}),
+        "kommuner": pd.DataFrame(
+            {
+                "code_1": ["0301", "5001", "9999"],
+                "name_1": ["Oslo", "Trondheim", "Ugyldig"],
+            }
+        ),
+        "kommuner_kort_kode": pd.DataFrame(
+            {"code_1": ["301", "9999"], "name_1": ["ShortCode", "Ugyldig"]}
+        ),
+        "fylker": pd.DataFrame(
+            {
+                "code_1": ["0300", "4200", "9900"],
+                "name_1": ["Oslo", "Agder", "Ugyldig"],
+            }
+        ),
+    }
 
-        out = mapping_bydeler_oslo(year="2024")
 
-        assert list(out.columns) == ["from", "to"]
-        assert "030116" not in out["from"].tolist()
-        assert "030117" not in out["from"].tolist()
-        assert "EAB" not in out["from"].tolist()
-        assert sorted(out["from"].tolist()) == sorted(["030101", "030102", "030103"])
-        assert (out["to"] == "EAB").all()
+# =============================================================================
+# SECTION 1: mapping_bydeler_oslo (BYDELER)
+# =============================================================================
 
-    def test_mapping_bydeler_oslo_returns_empty_if_only_filtered_codes(
-        self, mocker: Any
+
+class TestMappingBydelerOslo:
+    """Tests for mapping_bydeler_oslo(year)."""
+
+    @pytest.mark.parametrize(
+        ("pivot_key", "year", "expected_from"),
+        [
+            ("bydeler", "2024", {"030101", "030102", "030103"}),
+            # Only codes that are filtered out: the mapping is empty
+            ("bydeler_bare_filtrerte", 2024, set()),
+        ],
+    )
+    def test_mapping_bydeler_oslo_filters_and_sets_to_EAB(
+        self,
+        monkeypatch: Any,
+        pivots: dict[str, pd.DataFrame],
+        pivot_key: str,
+        year: str | int,
+        expected_from: set[str],
     ) -> None:
-        """Verify behavior when all available codes are filtered out."""
-        mocker.patch(
-            "ssb_kostra_python.regionshierarki.KlassClassification",
-            FakeKlassClassification_bb_eab,
-        )
-        FakeKlassClassification_bb_eab.pivot_df = pd.DataFrame(
-            {
-                "code_1": ["030116", "030117", "EAB"],
-            }
+        """Checks that 030116, 030117 and EAB are filtered out and the rest map to EAB."""
+        monkeypatch.setattr(
+            rh, "KlassClassification", make_fake_klass(pivots[pivot_key])
         )
 
-        out = mapping_bydeler_oslo(year=2024)
+        out = mapping_bydeler_oslo(year=year)
 
         assert list(out.columns) == ["from", "to"]
-        assert len(out) == 0
+        # The codes are unique, so the set plus the length pins the whole column
+        assert len(out) == len(expected_from)
+        assert set(out["from"].tolist()) == expected_from
+        assert (out["to"] == "EAB").all()
 
 
 # =============================================================================
@@ -106,9 +147,29 @@ class TestMappingBydelerOslo:
 # =============================================================================
 
 
+# Correspondence tables are constant, so they are built once at import. The
+# mapping functions only filter and copy .data, never modify it in place.
+_DF_KK_104 = pd.DataFrame(
+    {
+        "sourceCode": ["0301", "5001", "9999"],
+        "targetCode": ["0300", "5000", "9999"],
+    }
+)
+_DF_KK_112 = pd.DataFrame(
+    {
+        "sourceCode": ["0301", "5001", "9999"],
+        "targetCode": ["K1", "K2", "KX"],
+    }
+)
+# Shared by every fake instance asked for an unknown target classification
+_DF_KK_EMPTY = pd.DataFrame(columns=["sourceCode", "targetCode"])
+
+
 class FakeKlassCorrespondence_kk_eak:
     """Fake KlassCorrespondence that provides a `.data` DataFrame."""
 
+    __slots__ = ("data",)
+
     def __init__(
         self,
         source_classification_id: int,
@@ -116,126 +177,65 @@ class FakeKlassCorrespondence_kk_eak:
         from_date: str,
         to_date: str,
     ) -> None:
-        """Initializes an instance of the class with specified parameters."""
-        self.source_classification_id = source_classification_id
-        self.target_classification_id = target_classification_id
-        self.from_date = from_date
-        self.to_date = to_date
-
+        """Pick the correspondence table for the requested target classification."""
         if str(target_classification_id) == "104":  # kommune -> fylke
-            self.data = pd.DataFrame(
-                {
-                    "sourceCode": ["0301", "5001", "9999"],
-                    "targetCode": ["0300", "5000", "9999"],
-                }
-            )
+            self.data = _DF_KK_104
         elif str(target_classification_id) == "112":  # kommune -> KOSTRA-gruppe
-            self.data = pd.DataFrame(
-                {
-                    "sourceCode": ["0301", "5001", "9999"],
-                    "targetCode": ["K1", "K2", "KX"],
-                }
-            )
+            self.data = _DF_KK_112
         else:
-            self.data = pd.DataFrame(columns=["sourceCode", "targetCode"])
-
+            self.data = _DF_KK_EMPTY
 
-class FakeCodes_kk_eak:
-    """Fake codes object providing pivot_level(), used by FakeKlassClassification_kk_eak."""
 
-    def __init__(self, pivot_df: pd.DataFrame) -> None:
-        """Initializes an instance of the class with specified parameters."""
-        self._pivot_df = pivot_df
-
-    def pivot_level(self) -> pd.DataFrame:
-        return self._pivot_df
-
-
-class FakeKlassClassification_kk_eak:
-    """Fake KlassClassification returning a FakeCodes object."""
+class TestMappingFraKommuneTilLandet:
+    """Tests for mapping_fra_kommune_til_landet(year).
 
-    pivot_df: pd.DataFrame | None = None
+    Each test calls the function once, for the same year but with its own KLASS
+    fake, so its result must not be memoized on the year.
+    """
 
-    def __init__(
-        self,
-        klass_id: int,
-        language: str = "nb",
-        include_future: bool = True,
-        *args: Any,
-        **kwargs: Any,
+    def test_mapping_fra_kommune_til_landet_happy_path(
+        self, monkeypatch: Any, pivots: dict[str, pd.DataFrame]
     ) -> None:
-        """Initializes an instance of the class with specified parameters."""
-        self.klass_id = klass_id
-        self.language = language
-        self.include_future = include_future
-
-    def get_codes(self, *args: Any, **kwargs: Any) -> FakeCodes_kk_eak:
-        if self.__class__.pivot_df is None:
-            raise ValueError(
-                "pivot_df must be set to a DataFrame before calling get_codes."
-            )
-        return FakeCodes_kk_eak(self.__class__.pivot_df)
-
-
-class TestMappingFraKommuneTilLandet:
-    """Tests for mapping_fra_kommune_til_landet(year)."""
-
-    def test_mapping_fra_kommune_til_landet_happy_path(self, mocker: Any) -> None:
         """Validate the main invariants of mapping_fra_kommune_til_landet."""
-        mocker.patch(
-            "ssb_kostra_python.regionshierarki.KlassCorrespondence",
-            FakeKlassCorrespondence_kk_eak,
-        )
-        mocker.patch(
-            "ssb_kostra_python.regionshierarki.KlassClassification",
-            FakeKlassClassification_kk_eak,
-        )
-        FakeKlassClassification_kk_eak.pivot_df = pd.DataFrame(
-            {
-                "code_1": ["0301", "5001", "9999"],
-                "name_1": ["Oslo", "Trondheim", "Ugyldig"],
-            }
+        monkeypatch.setattr(rh, "KlassCorrespondence", FakeKlassCorrespondence_kk_eak)
+        monkeypatch.setattr(
+            rh, "KlassClassification", make_fake_klass(pivots["kommuner"])
         )
 
         out = mapping_fra_kommune_til_landet(year="2024")
 
         assert list(out.columns) == ["from", "to"]
-        assert not (out["from"] == "9999").any()
-        assert out["from"].str.len().eq(4).all()
+        assert "9999" not in set(out["from"].to_numpy())
+        _assert_codes(out["from"], length=4)
 
-        assert ((out["from"] == "0301") & (out["to"] == "EKA03")).any()
-        assert ((out["from"] == "5001") & (out["to"] == "EKA50")).any()
+        pairs = _mapping_pairs(out)
+        assert ("0301", "EKA03") in pairs
+        assert ("5001", "EKA50") in pairs
 
-        assert ((out["from"] == "0301") & (out["to"] == "K1")).any()
-        assert ((out["from"] == "5001") & (out["to"] == "K2")).any()
+        assert ("0301", "K1") in pairs
+        assert ("5001", "K2") in pairs
 
-        assert ((out["from"] == "0301") & (out["to"] == "EAK")).any()
-        assert ((out["from"] == "5001") & (out["to"] == "EAK")).any()
+        assert ("0301", "EAK") in pairs
+        assert ("5001", "EAK") in pairs
+        assert ("9999", "EAK") not in pairs
 
-        assert not ((out["from"] == "0301") & (out["to"] == "EAKUO")).any()
-        assert ((out["from"] == "5001") & (out["to"] == "EAKUO")).any()
+        assert ("0301", "EAKUO") not in pairs
+        assert ("5001", "EAKUO") in pairs
 
-    def test_from_is_zero_padded_when_short(self, mocker: Any) -> None:
+    def test_from_is_zero_padded_when_short(
+        self, monkeypatch: Any, pivots: dict[str, pd.DataFrame]
+    ) -> None:
         """Specifically validate the zero-padding behavior."""
-        mocker.patch(
-            "ssb_kostra_python.regionshierarki.KlassCorrespondence",
-            FakeKlassCorrespondence_kk_eak,
-        )
-        mocker.patch(
-            "ssb_kostra_python.regionshierarki.KlassClassification",
-            FakeKlassClassification_kk_eak,
-        )
-        FakeKlassClassification_kk_eak.pivot_df = pd.DataFrame(
-            {
-                "code_1": ["301", "9999"],
-                "name_1": ["ShortCode", "Ugyldig"],
-            }
+        monkeypatch.setattr(rh, "KlassCorrespondence", FakeKlassCorrespondence_kk_eak)
+        monkeypatch.setattr(
+            rh, "KlassClassification", make_fake_klass(pivots["kommuner_kort_kode"])
         )
 
         out = mapping_fra_kommune_til_landet(year=2024)
 
-        assert (out["from"] == "0301").any()
-        assert not (out["from"] == "301").any()
+        from_codes = set(out["from"].to_numpy())
+        assert "0301" in from_codes
+        assert "301" not in from_codes
 
 
 # =============================================================================
@@ -243,37 +243,48 @@ class TestMappingFraKommuneTilLandet:
 # =============================================================================
 
 
+# mapping_fra_kommune_til_fylkeskommune casts both columns to str before
+# padding, so the fake table can be categorical. The other tables stay plain
+# strings, like KLASS returns them, because those functions concat them as-is.
+_DF_KK_127 = pd.DataFrame(
+    {
+        "sourceCode": pd.Categorical(["0301", "9999", "1103", "301"]),
+        "targetCode": pd.Categorical(["0300", "9999", "1100", "11"]),
+    }
+)
+
+
 class FakeKlassCorrespondence_kk_fk:
     """Minimal fake for KlassCorrespondence(...).data used in mapping_fra_kommune_til_fylkeskommune."""
 
+    __slots__ = ("data",)
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         """Initializes an instance of the class with specified parameters."""
-        self.data = pd.DataFrame(
-            {
-                "sourceCode": ["0301", "9999", "1103", "301"],
-                "targetCode": ["0300", "9999", "1100", "11"],
-            }
-        )
+        self.data = _DF_KK_127
 
 
 class TestMappingFraKommuneTilFylkeskommune:
     """Tests for mapping_fra_kommune_til_fylkeskommune(year)."""
 
-    def test_mapping_filters_renames_and_pads(self, mocker: Any) -> None:
+    def test_mapping_filters_renames_and_pads(self, monkeypatch: Any) -> None:
         """Verify filtering and padding."""
-        mocker.patch(
-            "ssb_kostra_python.regionshierarki.KlassCorrespondence",
-            FakeKlassCorrespondence_kk_fk,
-        )
+        monkeypatch.setattr(rh, "KlassCorrespondence", FakeKlassCorrespondence_kk_fk)
         out = mapping_fra_kommune_til_fylkeskommune("2024")
 
         assert list(out.columns) == ["from", "to"]
-        assert not (out["from"] == "9999").any()
-        assert out["from"].map(lambda x: isinstance(x, str) and len(x) == 4).all()
-        assert out["to"].map(lambda x: isinstance(x, str) and len(x) == 4).all()
+        assert len(out) == 3
+        assert "9999" not in set(out["from"].to_numpy())
+        # A string dtype plus a vectorized length check; missing values have no
+        # length, so they fail the check as well
+        for col in ("from", "to"):
+            assert pd.api.types.is_string_dtype(out[col])
+            _assert_codes(out[col], length=4)
 
-        assert ((out["from"] == "0301") & (out["to"] == "0300")).any()
-        assert ((out["from"] == "0301") & (out["to"] == "0011")).any()
+        pairs = _mapping_pairs(out)
+        assert ("0301", "0300") in pairs
+        assert ("1103", "1100") in pairs
+        assert ("0301", "0011") in pairs
 
 
 # =============================================================================
@@ -281,9 +292,19 @@ class TestMappingFraKommuneTilFylkeskommune:
 # =============================================================================
 
 
+_DF_FK_152 = pd.DataFrame(
+    {
+        "sourceCode": ["0300", "4200", "9900"],
+        "targetCode": ["R1", "R2", "R9"],
+    }
+)
+
+
 class FakeKlassCorrespondence_fk_eafk:
     """Fake KlassCorrespondence that returns deterministic mapping rows for fylkes codes."""
 
+    __slots__ = ("data",)
+
     def __init__(
         self,
         source_classification_id: int,
@@ -292,83 +313,36 @@ class FakeKlassCorrespondence_fk_eafk:
         to_date: str,
     ) -> None:
         """Initializes an instance of the class with specified parameters."""
-        self.data = pd.DataFrame(
-            {
-                "sourceCode": ["0300", "4200", "9900"],
-                "targetCode": ["R1", "R2", "R9"],
-            }
-        )
-
-
-class FakeCodes_fk_eafk:
-    def __init__(self, pivot_df: pd.DataFrame) -> None:
-        """Initializes an instance of the class with specified parameters."""
-        self._pivot_df = pivot_df
-
-    def pivot_level(self) -> pd.DataFrame:
-        return self._pivot_df
-
-
-class FakeKlassClassification_fk_eafk:
-    """Fake KlassClassification providing fylkes codes via pivot_level()."""
-
-    pivot_df: pd.DataFrame | None = None
-
-    def __init__(
-        self,
-        klass_id: int,
-        language: str = "nb",
-        include_future: bool = True,
-        *args: Any,
-        **kwargs: Any,
-    ) -> None:
-        """Initializes an instance of the class with specified parameters."""
-        self.klass_id = klass_id
-
-    def get_codes(self, *args: Any, **kwargs: Any) -> FakeCodes_fk_eafk:
-        if self.__class__.pivot_df is None:
-            raise ValueError(
-                "pivot_df must be set to a DataFrame before calling get_codes."
-            )
-        return FakeCodes_fk_eafk(self.__class__.pivot_df)
+        self.data = _DF_FK_152
 
 
 class TestMappingFraFylkeskommuneTilKostraregion:
     """Tests for mapping_fra_fylkeskommune_til_kostraregion(year)."""
 
     def test_mapping_fra_fylkeskommune_til_kostraregion_happy_path(
-        self, mocker: Any
+        self, monkeypatch: Any, pivots: dict[str, pd.DataFrame]
     ) -> None:
         """Verify fylke to kostraregion mapping."""
-        mocker.patch(
-            "ssb_kostra_python.regionshierarki.KlassCorrespondence",
-            FakeKlassCorrespondence_fk_eafk,
-        )
-        mocker.patch(
-            "ssb_kostra_python.regionshierarki.KlassClassification",
-            FakeKlassClassification_fk_eafk,
-        )
-        FakeKlassClassification_fk_eafk.pivot_df = pd.DataFrame(
-            {
-                "code_1": ["0300", "4200", "9900"],
-                "name_1": ["Oslo", "Agder", "Ugyldig"],
-            }
+        monkeypatch.setattr(rh, "KlassCorrespondence", FakeKlassCorrespondence_fk_eafk)
+        monkeypatch.setattr(
+            rh, "KlassClassification", make_fake_klass(pivots["fylker"])
         )
 
         out = mapping_fra_fylkeskommune_til_kostraregion(year="2024")
 
         assert list(out.columns) == ["from", "to"]
-        assert ((out["from"] == "0300") & (out["to"] == "R1")).any()
-        assert ((out["from"] == "4200") & (out["to"] == "R2")).any()
-        assert ((out["from"] == "9900") & (out["to"] == "R9")).any()
+        pairs = _mapping_pairs(out)
+        assert ("0300", "R1") in pairs
+        assert ("4200", "R2") in pairs
+        assert ("9900", "R9") in pairs
 
-        assert ((out["from"] == "0300") & (out["to"] == "EAFK")).any()
-        assert ((out["from"] == "4200") & (out["to"] == "EAFK")).any()
-        assert not ((out["from"] == "9900") & (out["to"] == "EAFK")).any()
+        assert ("0300", "EAFK") in pairs
+        assert ("4200", "EAFK") in pairs
+        assert ("9900", "EAFK") not in pairs
 
-        assert not ((out["from"] == "0300") & (out["to"] == "EAFKUO")).any()
-        assert ((out["from"] == "4200") & (out["to"] == "EAFKUO")).any()
-        assert not ((out["from"] == "9900") & (out["to"] == "EAFKUO")).any()
+        assert ("0300", "EAFKUO") not in pairs
+        assert ("4200", "EAFKUO") in pairs
+        assert ("9900", "EAFKUO") not in pairs
 
         assert len(out) == 6
 
@@ -378,25 +352,41 @@ class TestMappingFraFylkeskommuneTilKostraregion:
 # =============================================================================
 
 
+# Error messages hierarki raises for invalid input, compiled once
+_RE_FLERE_PERIODER = re.compile("Mer enn 1 periode")
+_RE_INGEN_REGION = re.compile("Fant ingen gyldig regionkolonne")
+_RE_FLERE_REGIONER = re.compile("Fant flere regionskolonner")
+_RE_INKONSEKVENT = re.compile("Inkonsekvent valg")
+
+
+def _sorted_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Rows sorted on every column with a fresh index, for order-free comparison."""
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
 class TestHierarki:
-    """Tests for the main `hierarki` function."""
+    """Tests for the main `hierarki` function.
+
+    Most inputs use an integer periode. hierarki casts it to text, so the
+    expected output has string periods.
+    """
 
     def test_raises_if_more_than_one_periode(self) -> None:
         """Hierarki expects exactly one unique periode."""
         df = pd.DataFrame(
             {
-                "periode": ["2024", "2025"],
+                "periode": np.array([2024, 2025], dtype=np.int16),
                 "kommuneregion": ["0301", "0301"],
                 "personer": [1, 2],
             }
         )
-        with pytest.raises(KeyError, match="Mer enn 1 periode"):
+        with pytest.raises(KeyError, match=_RE_FLERE_PERIODER):
             hierarki(df)
 
     def test_raises_if_no_region_column(self) -> None:
         """Hierarki expects exactly one valid region column to exist."""
         df = pd.DataFrame({"periode": ["2025"], "personer": [1]})
-        with pytest.raises(ValueError, match="Fant ingen gyldig regionkolonne"):
+        with pytest.raises(ValueError, match=_RE_INGEN_REGION):
             hierarki(df)
 
     def test_raises_if_multiple_region_columns(self) -> None:
@@ -409,7 +399,7 @@ class TestHierarki:
                 "personer": [1],
             }
         )
-        with pytest.raises(ValueError, match="Fant flere regionskolonner"):
+        with pytest.raises(ValueError, match=_RE_FLERE_REGIONER):
             hierarki(df)
 
     def test_raises_if_inconsistent_aggregeringstype(self) -> None:
@@ -421,7 +411,7 @@ class TestHierarki:
                 "personer": [1],
             }
         )
-        with pytest.raises(ValueError, match="Inkonsekvent valg"):
+        with pytest.raises(ValueError, match=_RE_INKONSEKVENT):
             hierarki(df, aggregeringstype="kommune_til_landet")
 
     def test_kommune_til_landet_default_appends_aggregated_rows(
@@ -430,7 +420,7 @@ class TestHierarki:
         """Verify default kommune to landet aggregation."""
         df = pd.DataFrame(
             {
-                "periode": ["2025", "2025"],
+                "periode": np.array([2025, 2025], dtype=np.int16),
                 "kommuneregion": ["0301", "0301"],
                 "alder": ["001", "002"],
                 "personer": [10, 20],
@@ -451,17 +441,17 @@ class TestHierarki:
 
         out = hierarki(df)
 
-        assert len(out) == 4
-        assert (
-            (out["kommuneregion"] == "EAK")
-            & (out["alder"] == "001")
-            & (out["personer"] == 10)
-        ).any()
-        assert (
-            (out["kommuneregion"] == "EAK")
-            & (out["alder"] == "002")
-            & (out["personer"] == 20)
-        ).any()
+        expected = pd.DataFrame(
+            {
+                "periode": ["2025"] * 4,
+                "kommuneregion": ["0301", "0301", "EAK", "EAK"],
+                "alder": ["001", "002", "001", "002"],
+                "personer": [10, 20, 10, 20],
+            }
+        )
+        pd.testing.assert_frame_equal(
+            _sorted_rows(out), _sorted_rows(expected), check_dtype=False
+        )
 
         mock_map.assert_called_once()
         mock_definer.assert_called_once()
@@ -472,7 +462,7 @@ class TestHierarki:
         """Verify aggregation and column renaming."""
         df = pd.DataFrame(
             {
-                "periode": ["2025", "2025"],
+                "periode": np.array([2025, 2025], dtype=np.int16),
                 "kommuneregion": ["0301", "5001"],
                 "personer": [10, 20],
             }
@@ -496,7 +486,7 @@ class TestHierarki:
 
         assert "fylkesregion" in out.columns
         assert "kommuneregion" not in out.columns
-        assert out["fylkesregion"].str.endswith("00").all()
+        _assert_codes(out["fylkesregion"], length=4, suffix="00")
 
         mock_map.assert_called_once()
         mock_definer.assert_called_once()
@@ -505,7 +495,7 @@ class TestHierarki:
         """Verify fylkesregion to kostraregion aggregation."""
         df = pd.DataFrame(
             {
-                "periode": ["2025", "2025"],
+                "periode": np.array([2025, 2025], dtype=np.int16),
                 "fylkesregion": ["0300", "4200"],
                 "personer": [5, 7],
             }
@@ -524,8 +514,16 @@ class TestHierarki:
 
         out = hierarki(df)
 
-        assert ((out["fylkesregion"] == "KFK1") & (out["personer"] == 5)).any()
-        assert ((out["fylkesregion"] == "KFK2") & (out["personer"] == 7)).any()
+        expected = pd.DataFrame(
+            {
+                "periode": ["2025"] * 4,
+                "fylkesregion": ["0300", "4200", "KFK1", "KFK2"],
+                "personer": [5, 7, 5, 7],
+            }
+        )
+        pd.testing.assert_frame_equal(
+            _sorted_rows(out), _sorted_rows(expected), check_dtype=False
+        )
 
         mock_map.assert_called_once()
         mock_definer.assert_called_once()
@@ -534,7 +532,7 @@ class TestHierarki:
         """Verify bydel aggregation into EAB."""
         df = pd.DataFrame(
             {
-                "periode": ["2025", "2025"],
+                "periode": np.array([2025, 2025], dtype=np.int16),
                 "bydelsregion": ["030101", "030102"],
                 "personer": [3, 4],
             }
@@ -553,9 +551,111 @@ class TestHierarki:
 
         out = hierarki(df)
 
-        eab_rows = out[out["bydelsregion"] == "EAB"]
-        assert len(eab_rows) == 1
-        assert eab_rows["personer"].iloc[0] == 7
+        assert (out["bydelsregion"] == "EAB").sum() == 1
+        personer = out.groupby("bydelsregion", sort=False)["personer"].sum()
+        assert personer.loc["EAB"] == 7
+
+        mock_map.assert_called_once()
+        mock_definer.assert_called_once()
+
+    def test_empty_input_skips_mapping(self, mocker: Any) -> None:
+        """An empty input is returned without fetching any mapping."""
+        df = pd.DataFrame(
+            {
+                "periode": pd.Series([], dtype=str),
+                "kommuneregion": pd.Series([], dtype=str),
+                "personer": pd.Series([], dtype=int),
+            }
+        )
+        mock_map = mocker.patch(
+            "ssb_kostra_python.regionshierarki.mapping_fra_kommune_til_fylkeskommune"
+        )
+
+        out = hierarki(df, aggregeringstype="kommune_til_fylkeskommune")
+
+        assert out.empty
+        assert list(out.columns) == ["periode", "fylkesregion", "personer"]
+        mock_map.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "mapping",
+        [
+            pd.DataFrame({"from": ["0301"], "to": ["EAK"]}),
+            # KLASS returned nothing for the year
+            pd.DataFrame(columns=["from", "to"]),
+        ],
+    )
+    def test_no_matching_regions_returns_input(
+        self, mocker: Any, mapping: pd.DataFrame
+    ) -> None:
+        """If no region is in the mapping, the input is returned without aggregating.
+
+        The classification columns get the same dtypes as when rows are aggregated.
+        """
+        df = pd.DataFrame(
+            {
+                "periode": ["2025"],
+                "kommuneregion": ["2111"],
+                "alder": [1],
+                "personer": [30],
+            }
+        )
+        mock_map = mocker.patch(
+            "ssb_kostra_python.regionshierarki.mapping_fra_kommune_til_landet"
+        )
+        mocker.patch("builtins.input", return_value="alder")
+
+        mock_map.return_value = pd.DataFrame({"from": ["2111"], "to": ["EAK"]})
+        aggregert = hierarki(df)
+        mock_map.return_value = mapping
+        out = hierarki(df)
+
+        assert out["kommuneregion"].tolist() == ["2111"]
+        assert out["alder"].tolist() == ["1"]
+        assert out["personer"].tolist() == [30]
+        pd.testing.assert_series_equal(out.dtypes, aggregert.dtypes)
+
+
+# =============================================================================
+# SECTION 6: overfore_data_fra_fk_til_k(df)
+# =============================================================================
+
+
+class TestOverforeDataFraFkTilK:
+    """Tests for `overfore_data_fra_fk_til_k(df)`."""
+
+    def test_copies_fylke_values_to_all_kommuner(self, mocker: Any) -> None:
+        """Verify that each kommune inherits the value of its fylkeskommune."""
+        df = pd.DataFrame(
+            {
+                "periode": ["2024", "2024"],
+                "fylkesregion": ["4600", "0300"],
+                "levealder": [85.3, 84.1],
+            }
+        )
+
+        mock_map = mocker.patch(
+            "ssb_kostra_python.regionshierarki.mapping_fra_kommune_til_fylkeskommune"
+        )
+        mock_map.return_value = pd.DataFrame(
+            {
+                "from": ["4601", "4602", "0301"],
+                "to": ["4600", "4600", "0300"],
+            }
+        )
+        mock_definer = mocker.patch(
+            "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable"
+        )
+        mock_definer.return_value = (["periode", "kommuneregion"], ["levealder"])
+
+        out = overfore_data_fra_fk_til_k(df)
+
+        assert list(out.columns) == ["periode", "kommuneregion", "levealder"]
+        assert dict(zip(out["kommuneregion"], out["levealder"], strict=True)) == {
+            "4601": 85.3,
+            "4602": 85.3,
+            "0301": 84.1,
+        }
 
         mock_map.assert_called_once()
         mock_definer.assert_called_once()
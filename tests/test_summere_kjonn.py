@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+import pytest
 
 from ssb_kostra_python.summere_kjonn import summere_over_kjonn
 
@@ -79,3 +81,114 @@ class TestSummereOverKjonn:
         assert "kjonn" not in out.columns
 
         mock_definer_klass.assert_called_once()
+
+    def test_group_keys_keep_their_dtype(self, mocker: Any) -> None:
+        """Verify that grouping via categoricals does not leak into the output dtypes."""
+        df = pd.DataFrame(
+            {
+                "periode": ["2025", "2025", "2025", "2025"],
+                "kommuneregion": ["5001", "5001", "0301", "0301"],
+                "kjonn": ["1", "2", "1", "2"],
+                "personer": [1, 2, 3, 4],
+            }
+        )
+
+        mocker.patch(
+            "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+            return_value=(["periode", "kommuneregion", "kjonn"], ["personer"]),
+        )
+
+        out = summere_over_kjonn(df)
+
+        assert out["kommuneregion"].tolist() == ["5001", "0301"]
+        assert out["personer"].tolist() == [3, 7]
+        assert out["periode"].dtype == df["periode"].dtype
+        assert out["kommuneregion"].dtype == df["kommuneregion"].dtype
+
+    def test_numba_engine_matches_default(self, mocker: Any) -> None:
+        """Verify that engine='numba' gives the same frame as the pandas path."""
+        pytest.importorskip("numba")
+        df = pd.DataFrame(
+            {
+                "periode": ["2025", "2025", "2025", "2025"],
+                "kommuneregion": ["5001", "5001", "0301", "0301"],
+                "kjonn": ["1", "2", "1", "2"],
+                "personer": [1, 2, 3, 4],
+            }
+        )
+        mocker.patch(
+            "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+            return_value=(["periode", "kommuneregion", "kjonn"], ["personer"]),
+        )
+
+        out = summere_over_kjonn(df, engine="numba")
+
+        pd.testing.assert_frame_equal(out, summere_over_kjonn(df))
+
+    def test_numba_engine_matches_default_when_narrow_ints_overflow(
+        self, mocker: Any
+    ) -> None:
+        """Both engines keep int8 sums that overflow wide instead of wrapping."""
+        pytest.importorskip("numba")
+        df = pd.DataFrame(
+            {
+                "periode": ["2025", "2025", "2025"],
+                "kommuneregion": ["5001", "5001", "0301"],
+                "kjonn": ["1", "2", "1"],
+                "personer": np.array([100, 100, 1], dtype="int8"),
+            }
+        )
+        mocker.patch(
+            "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+            return_value=(["periode", "kommuneregion", "kjonn"], ["personer"]),
+        )
+
+        out = summere_over_kjonn(df, engine="numba")
+
+        assert out["personer"].tolist() == [200, 1]
+        pd.testing.assert_frame_equal(out, summere_over_kjonn(df))
+
+    def test_does_not_modify_input(self, mocker: Any) -> None:
+        """The classification step casts columns on a copy, not on the caller's frame."""
+        df = pd.DataFrame(
+            {
+                "periode": [2025, 2025],
+                "kommuneregion": ["0301", "0301"],
+                "kjonn": [1, 2],
+                "personer": [3, 4],
+            }
+        )
+        df_before = df.copy(deep=True)
+        mocker.patch("builtins.input", return_value="kjonn")
+
+        out = summere_over_kjonn(df)
+
+        pd.testing.assert_frame_equal(df, df_before)
+        assert out["personer"].tolist() == [7]
+
+    def test_single_kjonn_value_drops_column(self, mocker: Any) -> None:
+        """Verify that data with one kjonn value only loses the kjonn column."""
+        df = pd.DataFrame(
+            {
+                "periode": ["2025", "2025"],
+                "kjonn": ["0", "0"],
+                "kommuneregion": ["5001", "0301"],
+                "personer": [3, 7],
+            },
+            index=[10, 11],
+        )
+        mocker.patch(
+            "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+            return_value=(["periode", "kommuneregion", "kjonn"], ["personer"]),
+        )
+
+        out = summere_over_kjonn(df)
+
+        expected = pd.DataFrame(
+            {
+                "periode": ["2025", "2025"],
+                "kommuneregion": ["5001", "0301"],
+                "personer": [3, 7],
+            }
+        )
+        pd.testing.assert_frame_equal(out, expected)
@@ -54,12 +54,13 @@ class TestSummereTilAldersgrupperinger:
             return_value=(klass_vars, stat_vars),
         )
 
-        mocker.patch("ssb_kostra_python.summere_til_aldersgrupperinger.display")
+        mock_display = mocker.patch("IPython.display.display")
 
         # 5) Act: run function
         rename_variabel, groupby_variable, df_out = summere_til_aldersgrupperinger(
             df_input,
             hierarki_path="dummy/path.parquet",
+            verbose=True,
         )
 
         # 6) Assert: metadata
@@ -75,3 +76,70 @@ class TestSummereTilAldersgrupperinger:
         mock_read_parquet.assert_called_once()
         assert mock_format_fil.call_count == 2
         mock_definer_klass.assert_called_once()
+        mock_display.assert_called_once()
+
+    def test_reads_only_needed_periods_from_parquet(
+        self, mocker: Any, tmp_path: Any
+    ) -> None:
+        """The hierarchy file may store periode as int and contain other years."""
+        hierarki_path = tmp_path / "aldershierarki.parquet"
+        pd.DataFrame(
+            {
+                "periode": [2024, 2025, 2025],
+                "from": [1, 1, 2],
+                "to": ["000-004", "000-004", "000-004"],
+                "kommentar": ["x", "y", "z"],
+            }
+        ).to_parquet(hierarki_path)
+        df_input = pd.DataFrame(
+            {
+                "periode": ["2025", "2025"],
+                "alder": ["001", "002"],
+                "kommuneregion": ["0301", "0301"],
+                "personer": [10, 20],
+            }
+        )
+        mocker.patch(
+            "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+            return_value=(["periode", "kommuneregion", "to"], ["personer"]),
+        )
+        mock_display = mocker.patch("IPython.display.display")
+
+        _, _, df_out = summere_til_aldersgrupperinger(
+            df_input, hierarki_path=str(hierarki_path)
+        )
+
+        aggregated = df_out[df_out["alder"] == "000-004"]
+        assert aggregated["personer"].tolist() == [30]
+        assert "kommentar" not in df_out.columns
+        mock_display.assert_not_called()
+
+    def test_mixed_type_keys_form_one_group(self, mocker: Any) -> None:
+        """Codes like 1 and "1" in one key column are summed into the same group."""
+        df_input = pd.DataFrame(
+            {
+                "periode": ["2025", "2025"],
+                "alder": ["001", "002"],
+                "kommuneregion": ["0301", "0301"],
+                "kjonn": pd.Series([1, "1"], dtype=object),
+                "personer": [10, 20],
+            }
+        )
+        mocker.patch(
+            "pandas.read_parquet",
+            return_value=pd.DataFrame(
+                {"periode": ["2025", "2025"], "from": [1, 2], "to": ["000-004"] * 2}
+            ),
+        )
+        mocker.patch(
+            "ssb_kostra_python.hjelpefunksjoner.definere_klassifikasjonsvariable",
+            return_value=(["periode", "kommuneregion", "kjonn", "to"], ["personer"]),
+        )
+
+        _, _, df_out = summere_til_aldersgrupperinger(
+            df_input, hierarki_path="dummy/path.parquet"
+        )
+
+        aggregated = df_out[df_out["alder"] == "000-004"]
+        assert aggregated["kjonn"].tolist() == ["1"]
+        assert aggregated["personer"].tolist() == [30]
@@ -1,9 +1,10 @@
+from collections.abc import Iterator
 from typing import Any
 
 import pandas as pd
 import pytest
 
-from ssb_kostra_python.titler_til_klasskoder import _attach_one_mapping
+from ssb_kostra_python.titler_til_klasskoder import _fetch_mapping_arrays
 from ssb_kostra_python.titler_til_klasskoder import _fetch_mapping_for_year
 from ssb_kostra_python.titler_til_klasskoder import _pick_level_columns
 from ssb_kostra_python.titler_til_klasskoder import kodelister_navn
@@ -53,6 +54,14 @@ class FakeKlassClassification:
 PATCH_TARGET = "ssb_kostra_python.titler_til_klasskoder.KlassClassification"
 
 
+@pytest.fixture(autouse=True)
+def _clear_klass_cache() -> Iterator[None]:
+    """Each test sets its own fake KLASS data, so start from an empty cache."""
+    _fetch_mapping_arrays.cache_clear()
+    yield
+    _fetch_mapping_arrays.cache_clear()
+
+
 # -------------------------
 # _pick_level_columns tests
 # -------------------------
@@ -117,12 +126,49 @@ def test_fetch_mapping_for_year_returns_two_col_mapping_and_level(mocker: Any) -
     assert mapping["_map_name"].tolist() == ["Oslo", "Bergen"]
 
 
-# --------------------------------
-# _attach_one_mapping tests
-# --------------------------------
+def test_fetch_mapping_for_year_caches_klass_lookups(mocker: Any) -> None:
+    """Verify that repeated fetches of the same mapping only hit KLASS once."""
+    fake = mocker.patch(PATCH_TARGET, wraps=FakeKlassClassification)
+    FakeKlassClassification.pivot_df = pd.DataFrame(
+        {"code_1": ["0301"], "name_1": ["Oslo"]}
+    )
+
+    first, _ = _fetch_mapping_for_year(klass_id=231, year=2024, select_level=1)
+    first["_map_name"] = "changed"
+    second, _ = _fetch_mapping_for_year(klass_id=231, year=2024, select_level=1)
 
+    assert fake.call_count == 1
+    assert second["_map_name"].tolist() == ["Oslo"]
 
-def test_attach_one_mapping_inserts_name_column_after_code_and_builds_diagnostics(
+
+# -----------------------
+# kodelister_navn tests
+# -----------------------
+
+
+def test_kodelister_navn_requires_periode() -> None:
+    """Verify error if 'periode' is missing."""
+    df = pd.DataFrame({"kommuneregion": ["0301"]})
+    with pytest.raises(ValueError, match="must contain a 'periode'"):
+        kodelister_navn(
+            df,
+            mappings=[{"code_col": "kommuneregion", "klass_id": 231}],
+            verbose=False,
+        )
+
+
+def test_kodelister_navn_requires_exactly_one_unique_year() -> None:
+    """Verify error if multiple years are present."""
+    df = pd.DataFrame({"periode": [2023, 2024], "kommuneregion": ["0301", "0301"]})
+    with pytest.raises(ValueError, match="exactly one unique value"):
+        kodelister_navn(
+            df,
+            mappings=[{"code_col": "kommuneregion", "klass_id": 231}],
+            verbose=False,
+        )
+
+
+def test_kodelister_navn_inserts_name_column_after_code_and_builds_diagnostics(
     mocker: Any,
 ) -> None:
     """Verify name attachment and diagnostics."""
@@ -139,18 +185,14 @@ def test_attach_one_mapping_inserts_name_column_after_code_and_builds_diagnostic
             "periode": [2024, 2024, 2024],
             "kommuneregion": ["0301", "9999", "0302"],
             "value": [10, 20, 30],
-        }
+        },
+        index=[10, 11, 12],
     )
 
-    out, diag = _attach_one_mapping(
+    out, diag = kodelister_navn(
         df_in,
-        year=2024,
-        code_col="kommuneregion",
-        klass_id=231,
-        name_col_out=None,
-        language="nb",
-        include_future=True,
-        select_level=1,
+        mappings=[{"code_col": "kommuneregion", "klass_id": 231, "select_level": 1}],
+        verbose=False,
     )
 
     cols = list(out.columns)
@@ -159,49 +201,48 @@ def test_attach_one_mapping_inserts_name_column_after_code_and_builds_diagnostic
     assert out["kommuneregion_navn"].tolist()[0] == "Oslo"
     assert pd.isna(out["kommuneregion_navn"].tolist()[1])
     assert out["kommuneregion_navn"].tolist()[2] == "Bergen"
+    # The output gets a fresh RangeIndex, as with the earlier merge
+    assert out.index.equals(pd.RangeIndex(3))
 
-    assert diag["invalid_count"] == 1
-    assert diag["invalid_sample"] == ["9999"]
-    assert diag["all_invalid"] == ["9999"]
-    assert diag["level"] == 1
+    assert diag["kommuneregion"]["invalid_count"] == 1
+    assert diag["kommuneregion"]["invalid_sample"] == ["9999"]
+    assert diag["kommuneregion"]["all_invalid"] == ["9999"]
+    assert diag["kommuneregion"]["level"] == 1
 
 
-def test_attach_one_mapping_raises_if_code_col_missing(mocker: Any) -> None:
-    """Verify error on missing code column."""
+def test_kodelister_navn_reports_unique_invalid_codes_sorted(mocker: Any) -> None:
+    """Verify that repeated invalid codes are reported once, in sorted order."""
     mocker.patch(PATCH_TARGET, FakeKlassClassification)
     FakeKlassClassification.pivot_df = pd.DataFrame(
-        {"code_1": ["1"], "name_1": ["One"]}
+        {"code_1": ["0301"], "name_1": ["Oslo"]}
+    )
+    df_in = pd.DataFrame(
+        {"periode": [2024] * 5, "kommuneregion": ["9999", "0301", "1111", "9999", None]}
     )
-    df_in = pd.DataFrame({"periode": [2024], "value": [1]})
-    with pytest.raises(ValueError, match="Column 'kommuneregion' not found"):
-        _attach_one_mapping(
-            df_in, year=2024, code_col="kommuneregion", klass_id=231, select_level=1
-        )
-
-
-# -----------------------
-# kodelister_navn tests
-# -----------------------
 
+    _, diag = kodelister_navn(
+        df_in,
+        mappings=[{"code_col": "kommuneregion", "klass_id": 231, "select_level": 1}],
+        verbose=False,
+    )
 
-def test_kodelister_navn_requires_periode() -> None:
-    """Verify error if 'periode' is missing."""
-    df = pd.DataFrame({"kommuneregion": ["0301"]})
-    with pytest.raises(ValueError, match="must contain a 'periode'"):
-        kodelister_navn(
-            df,
-            mappings=[{"code_col": "kommuneregion", "klass_id": 231}],
-            verbose=False,
-        )
+    assert diag["kommuneregion"]["all_invalid"] == ["1111", "9999"]
+    assert diag["kommuneregion"]["invalid_count"] == 2
 
 
-def test_kodelister_navn_requires_exactly_one_unique_year() -> None:
-    """Verify error if multiple years are present."""
-    df = pd.DataFrame({"periode": [2023, 2024], "kommuneregion": ["0301", "0301"]})
-    with pytest.raises(ValueError, match="exactly one unique value"):
+def test_kodelister_navn_raises_if_code_col_missing(mocker: Any) -> None:
+    """Verify error on missing code column."""
+    mocker.patch(PATCH_TARGET, FakeKlassClassification)
+    FakeKlassClassification.pivot_df = pd.DataFrame(
+        {"code_1": ["1"], "name_1": ["One"]}
+    )
+    df_in = pd.DataFrame({"periode": [2024], "value": [1]})
+    with pytest.raises(ValueError, match="Column 'kommuneregion' not found"):
         kodelister_navn(
-            df,
-            mappings=[{"code_col": "kommuneregion", "klass_id": 231}],
+            df_in,
+            mappings=[
+                {"code_col": "kommuneregion", "klass_id": 231, "select_level": 1}
+            ],
             verbose=False,
         )
 
@@ -235,9 +276,13 @@ def test_kodelister_navn_applies_multiple_mappings_in_order(mocker: Any) -> None
         },
     ]
 
+    df_before = df.copy(deep=True)
+
     out, diag = kodelister_navn(df, mappings=mappings, verbose=False)
     cols = list(out.columns)
 
+    pd.testing.assert_frame_equal(df, df_before)
+
     i1 = cols.index("col1")
     assert cols[i1 + 1] == "col1_navn"
     assert out["col1_navn"].tolist() == ["Alpha", "Beta"]
@@ -250,3 +295,48 @@ def test_kodelister_navn_applies_multiple_mappings_in_order(mocker: Any) -> None
     assert "col2" in diag
     assert diag["col1"]["klass_id"] == 111
     assert diag["col2"]["klass_id"] == 222
+
+
+def test_kodelister_navn_fetches_each_klass_mapping_once(mocker: Any) -> None:
+    """Verify that prefetched mappings are reused by the merge loop."""
+    fake = mocker.patch(PATCH_TARGET, wraps=FakeKlassClassification)
+    FakeKlassClassification.pivot_df = pd.DataFrame(
+        {"code_1": ["A", "B"], "name_1": ["Alpha", "Beta"]}
+    )
+    df = pd.DataFrame({"periode": [2024], "col1": ["A"], "col2": ["B"]})
+    mappings = [
+        {"code_col": "col1", "klass_id": 111, "select_level": 1},
+        {"code_col": "col2", "klass_id": 222, "select_level": 1},
+    ]
+
+    out, _ = kodelister_navn(df, mappings=mappings, verbose=False)
+
+    assert out["col1_navn"].tolist() == ["Alpha"]
+    assert out["col2_navn"].tolist() == ["Beta"]
+    assert sorted(call.args[0] for call in fake.call_args_list) == ["111", "222"]
+
+
+def test_kodelister_navn_places_repeated_code_col_names_newest_first(
+    mocker: Any,
+) -> None:
+    """Verify column order when one code column is mapped more than once."""
+    mocker.patch(PATCH_TARGET, FakeKlassClassification)
+    FakeKlassClassification.pivot_df = pd.DataFrame(
+        {"code_1": ["A"], "name_1": ["Alpha"]}
+    )
+    df = pd.DataFrame({"periode": [2024], "col1": [" A"], "value": [1]})
+    mappings = [
+        {"code_col": "col1", "klass_id": 111, "select_level": 1},
+        {
+            "code_col": "col1",
+            "klass_id": 222,
+            "name_col_out": "col1_alt",
+            "select_level": 1,
+        },
+    ]
+
+    out, diag = kodelister_navn(df, mappings=mappings, verbose=False)
+
+    assert list(out.columns) == ["periode", "col1", "col1_alt", "col1_navn", "value"]
+    assert out["col1"].tolist() == ["A"]
+    assert sorted(diag) == ["col1", "col1|222"]
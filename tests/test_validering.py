@@ -1,14 +1,21 @@
+import gc
 import logging
+import weakref
+from collections.abc import Iterator
 from typing import Any
 
 import pandas as pd
 import pytest
 
+from ssb_kostra_python.validering import _get_klass_codes
 from ssb_kostra_python.validering import _klass_check
 from ssb_kostra_python.validering import _missing_cols
 from ssb_kostra_python.validering import _missing_values
 from ssb_kostra_python.validering import _number_of_periods_in_df
+from ssb_kostra_python.validering import _som_kategorier
+from ssb_kostra_python.validering import _som_tekst
 from ssb_kostra_python.validering import _valid_periode_region
+from ssb_kostra_python.validering import show_toggle
 
 
 @pytest.fixture
@@ -51,6 +58,35 @@ def test_missing_cols_logs_ok_when_all_present(
     assert "No missing columns" in caplog.text
 
 
+def test_show_toggle_previews_only_the_first_flagged_rows(mocker: Any) -> None:
+    df = pd.DataFrame({"kode": ["a", "b", "c", "d", "e"]}, index=[10, 11, 12, 13, 14])
+    mask = pd.Series([False, True, True, False, True], index=df.index)
+    mock_display = mocker.patch("ssb_kostra_python.validering.display")
+
+    show_toggle(df, mask, "Flagged rows", preview_rows=2)
+    box = mock_display.call_args.args[0]
+    box.children[1].value = True  # click the toggle button
+
+    preview = mock_display.call_args.args[0]
+    pd.testing.assert_frame_equal(preview, df.loc[mask].head(2))
+
+
+def test_show_toggle_widget_does_not_keep_the_frame_alive(mocker: Any) -> None:
+    df = pd.DataFrame({"kode": ["a", "b", "c"]})
+    mask = pd.Series([True, False, True])
+    mock_display = mocker.patch("ssb_kostra_python.validering.display")
+    df_ref = weakref.ref(df)
+
+    show_toggle(df, mask, "Flagged rows", preview_rows=1)
+    box = mock_display.call_args.args[0]
+    del df, mask
+    gc.collect()
+
+    assert df_ref() is None
+    box.children[1].value = True
+    assert mock_display.call_args.args[0]["kode"].tolist() == ["a"]
+
+
 def test_missing_values_detects_native_na_and_tokens(caplog: Any, mocker: Any) -> None:
     df = pd.DataFrame(
         {
@@ -104,6 +140,54 @@ def test_missing_values_zero_codes_are_missing_by_default(
     assert mock_show_toggle.call_count >= 1
 
 
+def test_missing_values_flags_the_same_rows_for_categorical_columns(
+    mocker: Any,
+) -> None:
+    df = pd.DataFrame({"periode": ["2024", None, "000<NA>", "2024", " "]})
+    df_cat = _som_kategorier(df, ["periode"])
+
+    mock_show_toggle = mocker.patch("ssb_kostra_python.validering.show_toggle")
+    _missing_values(df, ["periode"])
+    _missing_values(df_cat, ["periode"])
+
+    assert isinstance(df_cat["periode"].dtype, pd.CategoricalDtype)
+    (_, mask_str, _), _ = mock_show_toggle.call_args_list[0]
+    (_, mask_cat, _), _ = mock_show_toggle.call_args_list[1]
+    assert mask_str.tolist() == mask_cat.tolist() == [False, True, True, False, True]
+
+
+def test_som_kategorier_gives_text_categories_for_non_text_columns() -> None:
+    df = pd.DataFrame(
+        {
+            "funksjon": [100, 200, 100],
+            "art": pd.Categorical([10, 20, 10]),
+            "mixed": [1, "1", None],  # same text for two different values
+            "region": pd.Categorical(
+                ["0301", "1101", "0301"],
+                categories=pd.Index(["0301", "1101"], dtype=object),
+            ),
+        }
+    )
+
+    out = _som_kategorier(df, ["funksjon", "art", "mixed", "region"])
+
+    for col in out.columns:
+        assert isinstance(out[col].dtype, pd.CategoricalDtype)
+        assert out[col].cat.categories.dtype == "string"
+    assert out["funksjon"].tolist() == ["100", "200", "100"]
+    assert out["art"].tolist() == ["10", "20", "10"]
+    assert out["mixed"].tolist()[:2] == ["1", "1"]
+    assert pd.isna(out["mixed"].iloc[2])
+    assert out["region"].tolist() == ["0301", "1101", "0301"]
+
+
+@pytest.mark.parametrize("dtype", ["str", "string[python]", "string[pyarrow]"])
+def test_som_tekst_returns_text_columns_unchanged(dtype: str) -> None:
+    s = pd.Series(["0301", None, " 1101"], dtype=dtype)
+
+    assert _som_tekst(s) is s
+
+
 # Tests for _valid_periode_region
 def test_valid_periode_region_flags_bad_periode_format(
     caplog: Any, mocker: Any
@@ -137,6 +221,18 @@ def test_valid_periode_region_kommuneregion_requires_4_digits_if_numeric(
     # so the test mainly checks the numeric-length rule works.
 
 
+def test_valid_periode_region_bydelsregion_range_bounds(mocker: Any) -> None:
+    codes = ["030101", "030100", "030199", "039999", "040000", "30101", " 031234 "]
+    df = pd.DataFrame({"bydelsregion": codes})
+    mock_show_toggle = mocker.patch("ssb_kostra_python.validering.show_toggle")
+
+    _valid_periode_region(df, ["bydelsregion"], preview_rows=3)
+
+    (_, mask, _), kwargs = mock_show_toggle.call_args
+    assert mask.tolist() == [False, True, False, False, True, True, False]
+    assert kwargs["preview_rows"] == 3
+
+
 def test_valid_periode_region_bydelsregion_range_and_length(
     caplog: Any, mocker: Any
 ) -> None:
@@ -153,6 +249,30 @@ def test_valid_periode_region_bydelsregion_range_and_length(
     assert mock_show_toggle.call_count >= 1
 
 
+def test_valid_periode_region_reports_columns_in_order(mocker: Any) -> None:
+    df = pd.DataFrame(
+        {
+            "bydelsregion": ["030000", "030101"],
+            "periode": ["24", "2024"],
+            "kommuneregion": ["301", "0301"],
+        }
+    )
+    mock_show_toggle = mocker.patch("ssb_kostra_python.validering.show_toggle")
+
+    _valid_periode_region(df, ["periode", "kommuneregion", "bydelsregion"])
+
+    titles = [call.args[2] for call in mock_show_toggle.call_args_list]
+    assert titles == [
+        "Format-invalid 'periode' — click to preview",
+        "Format-invalid 'kommuneregion' — click to preview",
+        "Format-invalid 'bydelsregion' — click to preview",
+    ]
+    assert all(
+        call.args[1].tolist() == [True, False]
+        for call in mock_show_toggle.call_args_list
+    )
+
+
 # Tests for _number_of_periods_in_df
 def test_number_of_periods_returns_only_valid_years(caplog: Any, mocker: Any) -> None:
     df = pd.DataFrame(
@@ -192,6 +312,29 @@ class FakeKlass:
         return pd.DataFrame({"code": ["0301", "1101", "9999", "100", "200"]})
 
 
+@pytest.fixture(autouse=True)
+def _empty_klass_cache() -> Iterator[None]:
+    """Keep fetched KLASS codes from leaking between tests."""
+    _get_klass_codes.cache_clear()
+    yield
+    _get_klass_codes.cache_clear()
+
+
+def test_get_klass_codes_is_cached_in_memory_only(mocker: Any) -> None:
+    fake = mocker.patch(
+        "ssb_kostra_python.validering.KlassClassification", wraps=FakeKlass
+    )
+    first = _get_klass_codes(231, "2024")
+    assert _get_klass_codes(231, "2024") == first
+    assert "0301" in first
+    assert fake.call_count == 1
+
+    # A fresh run fetches the codes from KLASS again; nothing is kept on disk.
+    _get_klass_codes.cache_clear()
+    assert _get_klass_codes(231, "2024") == first
+    assert fake.call_count == 2
+
+
 def test_klass_check_skips_when_multiple_periods(caplog: Any, mocker: Any) -> None:
     df = pd.DataFrame(
         {
@@ -232,6 +375,29 @@ def test_klass_check_flags_invalid_codes(caplog: Any, mocker: Any) -> None:
     assert mock_show_toggle.call_count >= 1
 
 
+def test_klass_check_flags_invalid_codes_in_categorical_columns(
+    caplog: Any, mocker: Any
+) -> None:
+    df = pd.DataFrame(
+        {
+            "periode": ["2024", "2024", "2024"],
+            "kommuneregion": pd.Categorical(
+                [" 0301", "XXXX", "0301"], categories=[" 0301", "0301", "XXXX", "YYYY"]
+            ),  # YYYY is an unused category and must not be reported
+        }
+    )
+
+    mocker.patch("ssb_kostra_python.validering.KlassClassification", FakeKlass)
+    mock_show_toggle = mocker.patch("ssb_kostra_python.validering.show_toggle")
+
+    caplog.clear()
+    _klass_check(df, ["periode", "kommuneregion"], interactive=False)
+
+    assert "(1 distinct code(s))" in caplog.text
+    (_, mask, _), _ = mock_show_toggle.call_args
+    assert mask.tolist() == [False, True, False]
+
+
 def test_klass_check_passes_when_all_codes_valid(caplog: Any, mocker: Any) -> None:
     df = pd.DataFrame(
         {